@@ -1,5 +1,5 @@
 """Main Flask application for movie recommendations."""
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
 import time
 import threading
@@ -7,12 +7,23 @@ import json
 import os
 
 from services.tmdb_service import TMDbService
+from services.async_tmdb_service import AsyncTMDbService, run
 from utils.recommendation import (
-    get_content_based_recommendations,
-    get_hybrid_recommendations,
+    get_content_based_recommendations_async,
+    get_hybrid_recommendations_async,
     get_fallback_recommendations
 )
-from cache import get_cache_stats, clear_cache
+from cache import get_cache_stats, clear_cache, encoded_response
+from config import (
+    RECOMMENDATION_BUDGET_MS, RECOMMENDATION_HYBRID_TIMEOUT_MS, BATCH_MAX_IDS, TITLE_INDEX_FILE,
+    CACHE_WARMUP, PREFETCH_RECOMMENDATIONS, PREFETCH_SEARCH_PAGES, DEFAULT_WATCH_REGION
+)
+from utils.title_index import title_index
+from utils.catalog import movie_catalog
+from utils.sessions import RecommendationSession, session_store, fetch_seeds
+from utils.warmup import start_warmup, prefetch_recommendations, prefetch_search_page
+from utils.metrics import registry, route_latency
+from utils.profiler import profiler
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,31 +31,103 @@ CORS(app)  # Enable CORS for all routes
 
 # Initialize services
 tmdb_service = TMDbService()
+async_tmdb_service = AsyncTMDbService()
+
+# Bulk-load the autocomplete index in the background so startup isn't delayed
+if TITLE_INDEX_FILE:
+    threading.Thread(target=title_index.load_file, args=(TITLE_INDEX_FILE,), daemon=True).start()
+
+# Warm trending, details and recommendations in the background so readiness isn't delayed
+if CACHE_WARMUP:
+    start_warmup()
+
+@app.before_request
+def start_timer():
+    """Remember when the request started, for the latency histogram."""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_latency(response):
+    """Record the request's latency by route pattern, method and status."""
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        route_latency.observe(time.perf_counter() - started, route, request.method, str(response.status_code))
+    return response
+
+def cached_json(value, wrap=None, **extra):
+    """
+    JSON response for a cached value, reusing its encoded body.
+
+    The body is kept on the value's cache entry and served gzipped to clients
+    that accept it. A matching If-None-Match gets an empty 304.
+    """
+    encoded = encoded_response(value, wrap, **extra)
+    use_gzip = encoded.gzip_body is not None and request.accept_encodings['gzip'] > 0
+    etag = f"{encoded.etag}-gzip" if use_gzip else encoded.etag
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(encoded.gzip_body, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(encoded.body, mimetype='application/json')
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    return response
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
+    """Health check endpoint; status is "degraded" while the TMDb circuit breaker isn't closed."""
+    circuit = tmdb_service.get_circuit_stats()
     return jsonify({
-        'status': 'ok',
+        'status': 'ok' if circuit['state'] == 'closed' else 'degraded',
         'timestamp': time.time(),
-        'cache': get_cache_stats()
+        'cache': get_cache_stats(),
+        'http': tmdb_service.get_http_stats(),
+        'rate_limit': tmdb_service.get_rate_limit_stats(),
+        'circuit_breaker': circuit,
+        'autocomplete_index': title_index.stats(),
+        'catalog': movie_catalog.stats(),
+        'recommendation_sessions': len(session_store)
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/search', methods=['GET'])
-def search_movies():
-    """Search for movies by title or movies by person."""
+async def search_movies():
+    """Search for movies by title or movies by person, optionally merging several pages."""
     query = request.args.get('query', '')
     page = request.args.get('page', 1, type=int)
+    pages = request.args.get('pages', type=int)
+    limit = request.args.get('limit', type=int)
     search_type = request.args.get('search_type', 'movie') # Default to movie search
 
     if not query:
         return jsonify({'error': 'Query parameter is required'}), 400
+    if page < 1:
+        return jsonify({'error': 'page must be a positive integer'}), 400
+    for name, value in (('pages', pages), ('limit', limit)):
+        if value is not None and value < 1:
+            return jsonify({'error': f'{name} must be a positive integer'}), 400
 
     try:
         if search_type == 'person':
-            results = tmdb_service.search_person_movies(query, page)
-        else: # Default to movie search
+            return jsonify(tmdb_service.search_person_movies(query, page))
+
+        # Default to movie search
+        if pages or limit:
+            results = await run(async_tmdb_service.search_movies_pages(query, page, pages or 1, limit))
+            last_page = results['last_page']
+        else:
             results = tmdb_service.search_movies(query, page)
+            last_page = page
+        if PREFETCH_SEARCH_PAGES and last_page < results.get('total_pages', 0):
+            prefetch_search_page(query, last_page + 1)
         return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -68,27 +151,82 @@ def get_movie(movie_id):
     """Get detailed information about a movie."""
     try:
         movie = tmdb_service.get_movie_details(movie_id)
-        return jsonify(movie)
+        if PREFETCH_RECOMMENDATIONS:
+            prefetch_recommendations(movie_id)
+        return cached_json(movie)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/movies/batch', methods=['POST'])
+async def get_movies_batch():
+    """Get details for several movies in one request."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    slim = bool(data.get('slim', False))
+
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'ids must be a non-empty list of movie IDs'}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {BATCH_MAX_IDS} ids are allowed per request'}), 400
+
+    try:
+        movie_ids = [int(movie_id) for movie_id in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be integers'}), 400
+
+    try:
+        results = await run(async_tmdb_service.get_movie_details_batch(movie_ids, slim=slim))
+        return jsonify(results)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/movies/watch_providers/batch', methods=['POST'])
+async def get_watch_providers_batch():
+    """Get compact watch providers in one region for several movies in one request."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    region = data.get('region') or DEFAULT_WATCH_REGION
+
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'error': 'ids must be a non-empty list of movie IDs'}), 400
+    if len(ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {BATCH_MAX_IDS} ids are allowed per request'}), 400
+    if not isinstance(region, str):
+        return jsonify({'error': 'region must be a country code such as "US"'}), 400
+
+    try:
+        movie_ids = [int(movie_id) for movie_id in ids]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'ids must be integers'}), 400
+
+    try:
+        results = await run(async_tmdb_service.get_watch_providers_batch(movie_ids, region.upper()))
+        return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/movie/<int:movie_id>/watch_providers', methods=['GET'])
 def get_movie_watch_providers_route(movie_id):
-    """Get watch providers for a movie."""
+    """Get watch providers for a movie in one region, or in every region with region=all."""
+    region = (request.args.get('region') or DEFAULT_WATCH_REGION).upper()
+    if region == 'ALL':
+        region = None
+
     try:
-        providers = tmdb_service.get_movie_watch_providers(movie_id)
-        return jsonify(providers)
+        providers = tmdb_service.get_movie_watch_providers(movie_id, region)
+        return cached_json(providers)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/recommendations/movie/<int:movie_id>', methods=['GET'])
-def get_recommendations_by_movie(movie_id):
+async def get_recommendations_by_movie(movie_id):
     """Get movie recommendations based on a single movie."""
     limit = request.args.get('limit', 10, type=int)
+    budget_ms = request.args.get('budget_ms', RECOMMENDATION_BUDGET_MS, type=int)
 
     try:
-        recommendations = get_content_based_recommendations(movie_id, limit)
-        return jsonify({'results': recommendations})
+        recommendations = await run(get_content_based_recommendations_async(movie_id, limit, budget_ms=budget_ms))
+        return cached_json(recommendations, 'results')
     except Exception as e:
         # Fallback to trending if recommendations fail
         try:
@@ -102,10 +240,11 @@ def get_recommendations_by_movie(movie_id):
             return jsonify({'error': str(fallback_error)}), 500
 
 @app.route('/api/recommendations/hybrid', methods=['GET'])
-def get_hybrid_recommendations_endpoint():
+async def get_hybrid_recommendations_endpoint():
     """Get hybrid recommendations based on multiple movies."""
     movie_ids = request.args.get('movie_ids', '')
     limit = request.args.get('limit', 10, type=int)
+    timeout_ms = request.args.get('timeout_ms', RECOMMENDATION_HYBRID_TIMEOUT_MS, type=int)
 
     if not movie_ids:
         return jsonify({'error': 'movie_ids parameter is required'}), 400
@@ -117,8 +256,9 @@ def get_hybrid_recommendations_endpoint():
         if not movie_id_list:
             return jsonify({'error': 'No valid movie IDs provided'}), 400
 
-        recommendations = get_hybrid_recommendations(movie_id_list, limit)
-        return jsonify({'results': recommendations})
+        recommendations = await run(get_hybrid_recommendations_async(movie_id_list, limit, timeout_ms=timeout_ms))
+        incomplete_seeds = tuple(getattr(recommendations, 'incomplete_seeds', ()))
+        return cached_json(recommendations, 'results', incomplete_seeds=incomplete_seeds)
     except Exception as e:
         # Fallback to trending if recommendations fail
         try:
@@ -131,6 +271,100 @@ def get_hybrid_recommendations_endpoint():
         except Exception as fallback_error:
             return jsonify({'error': str(fallback_error)}), 500
 
+def _parse_movie_ids(values):
+    """Parse a JSON list of movie IDs, returning None if it isn't one."""
+    if not isinstance(values, list):
+        return None
+    try:
+        return [int(movie_id) for movie_id in values]
+    except (TypeError, ValueError):
+        return None
+
+def _session_response(token, session, errors=None, status=200):
+    """JSON response with a session's seeds and current recommendations."""
+    return jsonify({
+        'session': token,
+        'seeds': session.seeds,
+        'results': session.top(),
+        'errors': errors or {}
+    }), status
+
+@app.route('/api/recommendations/sessions', methods=['POST'])
+async def create_recommendation_session():
+    """Start an incremental hybrid recommendation session."""
+    data = request.get_json(silent=True) or {}
+    movie_ids = _parse_movie_ids(data.get('movie_ids', []))
+    limit = data.get('limit', 10)
+
+    if movie_ids is None:
+        return jsonify({'error': 'movie_ids must be a list of movie IDs'}), 400
+    if len(movie_ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {BATCH_MAX_IDS} ids are allowed per request'}), 400
+    if not isinstance(limit, int) or limit < 1:
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+
+    # The session is only stored once its seeds have loaded, so a failure leaves nothing behind
+    session = RecommendationSession(limit)
+    try:
+        seeds, errors = await run(fetch_seeds(session, movie_ids))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    session.add_seeds(seeds)
+    token = session_store.create(session)
+    return _session_response(token, session, errors, 201)
+
+@app.route('/api/recommendations/sessions/<token>', methods=['GET'])
+def get_recommendation_session(token):
+    """Get a session's current recommendations."""
+    session = session_store.get(token)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    return _session_response(token, session)
+
+@app.route('/api/recommendations/sessions/<token>', methods=['DELETE'])
+def delete_recommendation_session(token):
+    """End a session."""
+    if not session_store.delete(token):
+        return jsonify({'error': 'Session not found or expired'}), 404
+    return jsonify({'status': 'success'})
+
+@app.route('/api/recommendations/sessions/<token>/seeds', methods=['POST'])
+async def add_recommendation_session_seeds(token):
+    """Add seed movies to a session, fetching only the new seeds' candidates."""
+    session = session_store.get(token)
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+
+    data = request.get_json(silent=True) or {}
+    movie_ids = _parse_movie_ids(data.get('movie_ids'))
+    if not movie_ids:
+        return jsonify({'error': 'movie_ids must be a non-empty list of movie IDs'}), 400
+    if len(movie_ids) > BATCH_MAX_IDS:
+        return jsonify({'error': f'At most {BATCH_MAX_IDS} ids are allowed per request'}), 400
+
+    try:
+        seeds, errors = await run(fetch_seeds(session, movie_ids))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    # Merge into the stored session, which another request may have changed meanwhile
+    updated = session_store.update(token, lambda session: session.add_seeds(seeds))
+    if updated is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    session, _ = updated
+    return _session_response(token, session, errors)
+
+@app.route('/api/recommendations/sessions/<token>/seeds/<int:movie_id>', methods=['DELETE'])
+def remove_recommendation_session_seed(token, movie_id):
+    """Remove a seed movie from a session."""
+    updated = session_store.update(token, lambda session: session.remove_seed(movie_id))
+    if updated is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    session, removed = updated
+    if not removed:
+        return jsonify({'error': f'Movie {movie_id} is not a seed of this session'}), 404
+    return _session_response(token, session)
+
 @app.route('/api/trending', methods=['GET'])
 def get_trending():
     """Get trending movies."""
@@ -138,18 +372,53 @@ def get_trending():
 
     try:
         results = tmdb_service.get_trending_movies(time_window)
-        return jsonify(results)
+        return cached_json(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/admin/cache/clear', methods=['POST'])
 def clear_cache_endpoint():
-    """Clear the application cache (admin endpoint)."""
+    """Clear the application cache, and with local=true the autocomplete index and catalog (admin endpoint)."""
     clear_cache()
-    return jsonify({
+    response = {
         'status': 'success',
         'message': 'Cache cleared successfully',
         'cache': get_cache_stats()
+    }
+    if request.args.get('local', 'false').lower() in ('1', 'true', 'yes'):
+        title_index.clear()
+        movie_catalog.clear()
+        response['autocomplete_index'] = title_index.stats()
+        response['catalog'] = movie_catalog.stats()
+    return jsonify(response)
+
+@app.route('/api/admin/profiler', methods=['GET'])
+def get_profile():
+    """Get the sampled stacks in collapsed (flame graph) format (admin endpoint)."""
+    limit = request.args.get('limit', None, type=int)
+    return Response(profiler.report(limit), mimetype='text/plain')
+
+@app.route('/api/admin/profiler/start', methods=['POST'])
+def start_profiler():
+    """Start the sampling profiler (admin endpoint)."""
+    data = request.get_json(silent=True) or {}
+    interval = data.get('interval')
+    if interval is not None and (not isinstance(interval, (int, float)) or interval <= 0):
+        return jsonify({'error': 'interval must be a positive number of seconds'}), 400
+
+    started = profiler.start(interval)
+    return jsonify({
+        'status': 'success' if started else 'already running',
+        'profiler': profiler.stats()
+    })
+
+@app.route('/api/admin/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the sampling profiler, keeping its samples (admin endpoint)."""
+    stopped = profiler.stop()
+    return jsonify({
+        'status': 'success' if stopped else 'not running',
+        'profiler': profiler.stats()
     })
 
 if __name__ == '__main__':
@@ -0,0 +1,284 @@
+"""
+Local stand-in for the TMDb API, serving a generated catalog.
+
+Run it on its own and point the app at it::
+
+    python -m benchmarks.fake_tmdb --port 8010 --movies 5000 --latency-ms 80
+    TMDB_BASE_URL=http://127.0.0.1:8010/3 TMDB_API_KEY=fake python app.py
+
+Latency, server errors and TMDb-style 429 rate limiting are configurable.
+GET /_stats returns request counts per endpoint; POST /_reset clears them.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+WORDS = (
+    "dark night star river silent city last lost iron red winter storm golden shadow "
+    "secret blue broken wild empire ghost fire dream glass echo north frozen hidden "
+    "savage crimson midnight endless paper stone quiet electric hollow velvet"
+).split()
+GENRES = (28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749, 878, 53, 10752, 37)
+PAGE_SIZE = 20
+
+def generate_catalog(movies=5000, people=500, seed=42):
+    """Generate a deterministic catalog of movies and people."""
+    rng = random.Random(seed)
+    catalog = {'movies': {}, 'people': {}}
+
+    for movie_id in range(1, movies + 1):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).title()
+        catalog['movies'][movie_id] = {
+            'id': movie_id,
+            'title': f"{title} {movie_id}",
+            'original_title': f"{title} {movie_id}",
+            'overview': ' '.join(rng.choice(WORDS) for _ in range(40)),
+            'genres': [{'id': genre, 'name': str(genre)} for genre in rng.sample(GENRES, rng.randint(1, 3))],
+            'keywords': {'keywords': [{'id': k, 'name': f"kw{k}"} for k in rng.sample(range(1, 2000), 12)]},
+            'vote_average': round(rng.uniform(3, 9), 1),
+            'vote_count': rng.randint(10, 20000),
+            # Heavy-tailed popularity, like the real catalog
+            'popularity': round(rng.paretovariate(1.5) * 5, 3),
+            'release_date': f"{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'runtime': rng.randint(80, 180),
+            'poster_path': f"/poster{movie_id}.jpg",
+            'backdrop_path': f"/backdrop{movie_id}.jpg"
+        }
+
+    movie_ids = list(catalog['movies'])
+    for person_id in range(1, people + 1):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {person_id}"
+        credits = rng.sample(movie_ids, min(len(movie_ids), rng.randint(5, 60)))
+        catalog['people'][person_id] = {'id': person_id, 'name': name, 'movie_ids': credits}
+
+    for person in catalog['people'].values():
+        for movie_id in person['movie_ids']:
+            catalog['movies'][movie_id].setdefault('cast_ids', []).append(person['id'])
+
+    return catalog
+
+def _card(movie):
+    """A movie as it appears in TMDb result lists."""
+    return {
+        'id': movie['id'],
+        'title': movie['title'],
+        'original_title': movie['original_title'],
+        'overview': movie['overview'],
+        'genre_ids': [genre['id'] for genre in movie['genres']],
+        'vote_average': movie['vote_average'],
+        'vote_count': movie['vote_count'],
+        'popularity': movie['popularity'],
+        'release_date': movie['release_date'],
+        'poster_path': movie['poster_path'],
+        'backdrop_path': movie['backdrop_path']
+    }
+
+def _page(items, page):
+    """A TMDb-style page of results."""
+    start = (page - 1) * PAGE_SIZE
+    return {
+        'page': page,
+        'results': items[start:start + PAGE_SIZE],
+        'total_pages': max((len(items) + PAGE_SIZE - 1) // PAGE_SIZE, 1),
+        'total_results': len(items)
+    }
+
+class FakeTMDb:
+    """Request routing, fault injection and accounting for the fake server."""
+
+    def __init__(self, catalog, latency_ms=50, jitter_ms=20, error_rate=0.0,
+                 rate_limit=None, rate_period=10, seed=0):
+        self.catalog = catalog
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []
+        self.counts = {}
+        self.statuses = {}
+
+        movies = list(catalog['movies'].values())
+        self._by_popularity = sorted(movies, key=lambda movie: movie['popularity'], reverse=True)
+        self._by_genre = {}
+        for movie in self._by_popularity:
+            for genre in movie['genres']:
+                self._by_genre.setdefault(genre['id'], []).append(movie)
+
+    def _record(self, endpoint, status):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def _throttled(self):
+        """Sliding-window rate limit; returns seconds until a slot frees up, or 0."""
+        if not self.rate_limit:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < self.rate_period]
+            if len(self._window) >= self.rate_limit:
+                return self.rate_period - (now - self._window[0])
+            self._window.append(now)
+            return 0
+
+    def stats(self):
+        with self._lock:
+            return {'requests': sum(self.counts.values()), 'endpoints': dict(self.counts),
+                    'statuses': dict(self.statuses)}
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.statuses.clear()
+
+    def handle(self, path, query):
+        """Return (status, body dict, headers) for a request."""
+        path = path.removeprefix('/3/')
+        endpoint = re.sub(r'(?<=/)\d+(?=/|$)', '{id}', path)
+
+        retry_after = self._throttled()
+        if retry_after:
+            self._record(endpoint, 429)
+            body = {'status_code': 25, 'status_message': 'Too many requests'}
+            return 429, body, {'Retry-After': str(int(retry_after) + 1)}
+
+        with self._lock:
+            delay = max(self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms), 0) / 1000
+            failed = self._rng.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            self._record(endpoint, 500)
+            return 500, {'status_code': 11, 'status_message': 'Internal error'}, {}
+
+        status, body = self._route(endpoint, path, query)
+        self._record(endpoint, status)
+        return status, body, {}
+
+    def _route(self, endpoint, path, query):
+        ids = [int(part) for part in re.findall(r'/(\d+)(?=/|$)', path)]
+        page = int(query.get('page', ['1'])[0] or 1)
+        text = query.get('query', [''])[0].lower()
+        movies = self.catalog['movies']
+
+        if endpoint == 'search/movie':
+            matches = [_card(movie) for movie in self._by_popularity if text in movie['title'].lower()]
+            return 200, _page(matches, page)
+        if endpoint.startswith('trending/movie/'):
+            offset = 0 if endpoint.endswith('/day') else PAGE_SIZE
+            return 200, _page([_card(movie) for movie in self._by_popularity[offset:offset + PAGE_SIZE]], 1)
+        if endpoint == 'search/person':
+            matches = [{'id': person['id'], 'name': person['name']}
+                       for person in self.catalog['people'].values() if text in person['name'].lower()]
+            return 200, _page(matches, page)
+
+        if not ids or (endpoint.startswith('movie/') and ids[0] not in movies) \
+                or (endpoint.startswith('person/') and ids[0] not in self.catalog['people']):
+            return 404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'}
+
+        if endpoint == 'movie/{id}':
+            movie = dict(movies[ids[0]])
+            cast_ids = movie.pop('cast_ids', [])
+            movie['credits'] = {'cast': [
+                {'id': person_id, 'name': self.catalog['people'][person_id]['name'], 'character': 'Self'}
+                for person_id in cast_ids[:20]
+            ], 'crew': []}
+            movie['videos'] = {'results': []}
+            return 200, movie
+        if endpoint == 'movie/{id}/recommendations':
+            movie = movies[ids[0]]
+            similar = self._by_genre.get(movie['genres'][0]['id'], [])
+            return 200, _page([_card(other) for other in similar[:PAGE_SIZE + 1] if other['id'] != movie['id']], 1)
+        if endpoint == 'movie/{id}/watch/providers':
+            return 200, {'id': ids[0], 'results': {
+                region: {'link': f"https://example.invalid/{ids[0]}/{region}",
+                         'flatrate': [{'provider_id': 8, 'provider_name': 'Netflix'}]}
+                for region in ('US', 'GB', 'DE', 'FR', 'JP')
+            }}
+        if endpoint == 'person/{id}/movie_credits':
+            person = self.catalog['people'][ids[0]]
+            return 200, {'id': person['id'], 'cast': [
+                {**_card(movies[movie_id]), 'character': 'Self'} for movie_id in person['movie_ids']
+            ], 'crew': []}
+
+        return 404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'}
+
+def _handler(fake):
+    """Build a request handler class bound to a FakeTMDb."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/_stats':
+                self._send(200, fake.stats())
+            else:
+                self._send(*fake.handle(url.path, parse_qs(url.query)))
+
+        def do_POST(self):
+            if urlparse(self.path).path == '/_reset':
+                fake.reset()
+                self._send(200, {'status': 'success'})
+            else:
+                self._send(404, {'status_message': 'Not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """Start a fake TMDb server in a daemon thread; returns (server, FakeTMDb, base_url)."""
+    catalog_options = {key: options.pop(key) for key in ('movies', 'people', 'seed') if key in options}
+    fake = FakeTMDb(generate_catalog(**catalog_options), **options)
+    server = ThreadingHTTPServer((host, port), _handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-tmdb", daemon=True).start()
+    return server, fake, f"http://{host}:{server.server_port}/3"
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Serve a generated catalog through a TMDb-compatible API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--movies', type=int, default=5000, help="movies in the generated catalog")
+    parser.add_argument('--people', type=int, default=500, help="people in the generated catalog")
+    parser.add_argument('--seed', type=int, default=42, help="catalog generation seed")
+    parser.add_argument('--latency-ms', type=float, default=50, help="mean response latency")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="uniform latency jitter")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument('--rate-limit', type=int, default=None, help="requests per --rate-period before 429s")
+    parser.add_argument('--rate-period', type=float, default=10, help="rate limit window in seconds")
+    args = parser.parse_args()
+
+    server, _, base_url = start_server(
+        args.host, args.port, movies=args.movies, people=args.people, seed=args.seed,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+        rate_limit=args.rate_limit, rate_period=args.rate_period
+    )
+    print(f"Fake TMDb serving {args.movies} movies at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
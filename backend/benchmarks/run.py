@@ -0,0 +1,330 @@
+"""
+Load-test every API route against the fake TMDb server and record the results.
+
+Run from ``backend/``::
+
+    python -m benchmarks.run --levels 1,8,32 --requests 1000 --output before.json
+    python -m benchmarks.run --levels 1,8,32 --requests 1000 --compare before.json
+
+Each concurrency level starts from an empty cache, autocomplete index and
+in-process movie catalog (unless ``--warm``); a ``CATALOG_PATH`` catalog
+file is kept, and each level records the local state it started from under
+``local_state``. Levels report throughput, p50/p95/p99 latency overall and
+per route, upstream TMDb calls and cache hit rates. ``--compare`` exits non-zero when
+throughput drops or p95 latency grows by more than ``--threshold`` percent.
+
+Every API route is driven except the health, metrics and admin routes,
+which the harness only calls between levels. Recommendation sessions are
+checked out by one request at a time, so a session is never deleted under
+another request using it.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import requests
+from benchmarks.fake_tmdb import WORDS, start_server
+
+# Relative weight of each scenario in the request mix
+ROUTE_WEIGHTS = {
+    'trending': 10,
+    'movie': 25,
+    'recommendations': 20,
+    'hybrid': 5,
+    'search': 10,
+    'autocomplete': 15,
+    'watch_providers': 5,
+    'batch': 5,
+    'watch_providers_batch': 3,
+    'person': 5,
+    'session_create': 3,
+    'session_get': 3,
+    'session_seed': 5,
+    'session_remove_seed': 2,
+    'session_delete': 1
+}
+
+# Routes that need an existing session (every session_* route but session_create)
+SESSION_ROUTES = ('session_get', 'session_seed', 'session_remove_seed', 'session_delete')
+
+# Live sessions kept for later session requests; newer ones beyond this are left to expire
+SESSION_POOL_SIZE = 50
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(int(round(pct / 100 * len(ordered))) - 1, 0)]
+
+def _latency_summary(latencies):
+    """Latency percentiles in milliseconds."""
+    return {
+        'p50': _ms(percentile(latencies, 50)),
+        'p95': _ms(percentile(latencies, 95)),
+        'p99': _ms(percentile(latencies, 99)),
+        'mean': _ms(sum(latencies) / len(latencies)) if latencies else None
+    }
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+class Workload:
+    """Random requests over the catalog, with Zipf-like skew towards low movie ids."""
+
+    def __init__(self, movies, seed=0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.movie_ids = list(range(1, movies + 1))
+        self.weights = list(itertools.accumulate(1 / rank for rank in range(1, movies + 1)))
+        self.routes = list(ROUTE_WEIGHTS)
+        self.route_weights = list(itertools.accumulate(ROUTE_WEIGHTS.values()))
+        # Idle sessions by token, with their seeds; a request checks one out until it finishes
+        self.sessions = {}
+
+    def _movie_id(self):
+        return self.rng.choices(self.movie_ids, cum_weights=self.weights)[0]
+
+    def finish(self, route, token, response):
+        """Return a checked-out session, or add a created one, given the response (None on failure)."""
+        if response is None or route == 'session_delete':
+            return
+        body = response.json()
+        with self.lock:
+            if len(self.sessions) < SESSION_POOL_SIZE or route != 'session_create':
+                self.sessions[body['session']] = body['seeds']
+
+    def next_request(self):
+        """Return (route name, method, path, JSON body or None, checked-out session token or None)."""
+        with self.lock:
+            route = self.rng.choices(self.routes, cum_weights=self.route_weights)[0]
+            if route in SESSION_ROUTES:
+                # With no idle session, start one instead
+                if not self.sessions:
+                    route = 'session_create'
+                else:
+                    token = self.rng.choice(list(self.sessions))
+                    seeds = self.sessions.pop(token)
+                    if route == 'session_remove_seed' and not seeds:
+                        route = 'session_seed'
+            if route == 'session_create':
+                body = {'movie_ids': [self._movie_id() for _ in range(2)]}
+                return route, 'POST', "/api/recommendations/sessions", body, None
+            path = f"/api/recommendations/sessions/{token}" if route in SESSION_ROUTES else None
+            if route == 'session_get':
+                return route, 'GET', path, None, token
+            if route == 'session_seed':
+                return route, 'POST', f"{path}/seeds", {'movie_ids': [self._movie_id()]}, token
+            if route == 'session_remove_seed':
+                return route, 'DELETE', f"{path}/seeds/{self.rng.choice(seeds)}", None, token
+            if route == 'session_delete':
+                return route, 'DELETE', path, None, token
+            return (*self._stateless_request(route), None)
+
+    def _stateless_request(self, route):
+        """Return (route name, method, path, JSON body or None) for a route that needs no session."""
+        if route == 'trending':
+            return route, 'GET', f"/api/trending?time_window={self.rng.choice(['day', 'week'])}", None
+        if route == 'movie':
+            return route, 'GET', f"/api/movie/{self._movie_id()}", None
+        if route == 'recommendations':
+            return route, 'GET', f"/api/recommendations/movie/{self._movie_id()}", None
+        if route == 'hybrid':
+            ids = ','.join(str(self._movie_id()) for _ in range(3))
+            return route, 'GET', f"/api/recommendations/hybrid?movie_ids={ids}", None
+        if route == 'search':
+            return route, 'GET', f"/api/search?query={self.rng.choice(WORDS)}", None
+        if route == 'autocomplete':
+            word = self.rng.choice(WORDS)
+            return route, 'GET', f"/api/autocomplete?query={word[:self.rng.randint(2, len(word))]}", None
+        if route == 'watch_providers':
+            return route, 'GET', f"/api/movie/{self._movie_id()}/watch_providers", None
+        if route == 'batch':
+            return route, 'POST', "/api/movies/batch", {'ids': [self._movie_id() for _ in range(10)], 'slim': True}
+        if route == 'watch_providers_batch':
+            body = {'ids': [self._movie_id() for _ in range(10)], 'region': self.rng.choice(['US', 'GB', 'DE'])}
+            return route, 'POST', "/api/movies/watch_providers/batch", body
+        return route, 'GET', f"/api/search?query={self.rng.choice(WORDS)}&search_type=person", None
+
+def _start_app(tmdb_url):
+    """Serve the app on a local port in a daemon thread; returns its base URL."""
+    # config.py reads these at import time, so set them before the app is imported
+    os.environ['TMDB_BASE_URL'] = tmdb_url
+    os.environ.setdefault('TMDB_API_KEY', 'benchmark')
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Per-request access logs would dominate the output and the timings
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="benchmark-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+def _cache_counters(app_url):
+    cache = requests.get(f"{app_url}/api/health", timeout=30).json()['cache']
+    return {key: cache.get(key, 0) for key in ('hits', 'misses', 'coalesced', 'stale_hits', 'disk_hits')}
+
+def _local_state(app_url):
+    """Movies already held by the autocomplete index and catalog, which answer requests without TMDb."""
+    health = requests.get(f"{app_url}/api/health", timeout=30).json()
+    return {
+        'autocomplete_movies': health['autocomplete_index']['movies'],
+        'catalog_movies': health['catalog']['movies']
+    }
+
+def _upstream_counters(tmdb_url):
+    return requests.get(tmdb_url.rsplit('/3', 1)[0] + '/_stats', timeout=30).json()
+
+def run_level(app_url, tmdb_url, workload, concurrency, total_requests, warm=False):
+    """Drive total_requests requests at a concurrency level and summarize them."""
+    if not warm:
+        requests.post(f"{app_url}/api/admin/cache/clear?local=true", timeout=30)
+    requests.post(tmdb_url.rsplit('/3', 1)[0] + '/_reset', timeout=30)
+    cache_before = _cache_counters(app_url)
+    local_state = _local_state(app_url)
+
+    local = threading.local()
+    counter = itertools.count()
+    samples = []
+    samples_lock = threading.Lock()
+
+    def worker():
+        session = getattr(local, 'session', None) or requests.Session()
+        local.session = session
+        while next(counter) < total_requests:
+            route, method, path, body, token = workload.next_request()
+            started = time.perf_counter()
+            try:
+                response = session.request(method, app_url + path, json=body, timeout=120)
+                ok = response.status_code < 400 and not _is_fallback(response)
+            except requests.RequestException:
+                ok = False
+            if route == 'session_create' or token:
+                workload.finish(route, token, response if ok else None)
+            elapsed = time.perf_counter() - started
+            with samples_lock:
+                samples.append((route, elapsed, ok))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - started
+
+    cache_after = _cache_counters(app_url)
+    cache = {key: cache_after[key] - cache_before[key] for key in cache_after}
+    lookups = cache['hits'] + cache['misses'] + cache['coalesced'] + cache['stale_hits']
+    cache['hit_rate'] = round((lookups - cache['misses']) / lookups, 4) if lookups else None
+
+    routes = {}
+    for route in ROUTE_WEIGHTS:
+        latencies = [elapsed for name, elapsed, _ in samples if name == route]
+        if latencies:
+            routes[route] = {
+                'requests': len(latencies),
+                'errors': sum(1 for name, _, ok in samples if name == route and not ok),
+                'latency_ms': _latency_summary(latencies)
+            }
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': sum(1 for _, _, ok in samples if not ok),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(samples) / duration, 2) if duration else None,
+        'latency_ms': _latency_summary([elapsed for _, elapsed, _ in samples]),
+        'routes': routes,
+        'upstream': _upstream_counters(tmdb_url),
+        'cache': cache,
+        'local_state': local_state
+    }
+
+def _is_fallback(response):
+    """Whether a recommendation response fell back to trending after an error."""
+    if not response.headers.get('Content-Type', '').startswith('application/json'):
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get('fallback') is True
+
+def compare(current, baseline, threshold):
+    """Print per-level changes against a baseline run; returns the list of regressions."""
+    regressions = []
+    previous = {level['concurrency']: level for level in baseline['levels']}
+    for level in current['levels']:
+        before = previous.get(level['concurrency'])
+        if before is None:
+            continue
+        for metric, higher_is_better in (('throughput_rps', True), ('p95', False), ('p99', False)):
+            old = before[metric] if metric == 'throughput_rps' else before['latency_ms'][metric]
+            new = level[metric] if metric == 'throughput_rps' else level['latency_ms'][metric]
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change if higher_is_better else change
+            flag = ' REGRESSION' if worse > threshold else ''
+            print(f"  c={level['concurrency']:<4} {metric:<15} {old:>10} -> {new:>10} ({change:+.1f}%){flag}")
+            if flag:
+                regressions.append((level['concurrency'], metric, change))
+    return regressions
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the API against a local fake TMDb.")
+    parser.add_argument('--levels', default='1,8,32', help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=500, help="requests per concurrency level")
+    parser.add_argument('--warm', action='store_true', help="keep the cache between levels")
+    parser.add_argument('--tmdb-url', help="use an already running fake TMDb (e.g. http://127.0.0.1:8010/3)")
+    parser.add_argument('--movies', type=int, default=5000, help="movies in the generated catalog")
+    parser.add_argument('--latency-ms', type=float, default=50, help="fake TMDb mean latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fake TMDb fraction of 500s")
+    parser.add_argument('--rate-limit', type=int, default=None, help="fake TMDb requests per 10s before 429s")
+    parser.add_argument('--seed', type=int, default=0, help="workload seed")
+    parser.add_argument('--output', default=f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json",
+                        help="where to save the results")
+    parser.add_argument('--compare', help="baseline results file to compare against")
+    parser.add_argument('--threshold', type=float, default=10, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    tmdb_url = args.tmdb_url
+    if not tmdb_url:
+        _, _, tmdb_url = start_server(movies=args.movies, latency_ms=args.latency_ms,
+                                      error_rate=args.error_rate, rate_limit=args.rate_limit)
+    app_url = _start_app(tmdb_url)
+    workload = Workload(args.movies, args.seed)
+
+    results = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'levels': []
+    }
+    for concurrency in (int(level) for level in args.levels.split(',')):
+        level = run_level(app_url, tmdb_url, workload, concurrency, args.requests, warm=args.warm)
+        results['levels'].append(level)
+        latency = level['latency_ms']
+        print(f"c={concurrency:<4} {level['throughput_rps']:>8} req/s  p50 {latency['p50']}ms  "
+              f"p95 {latency['p95']}ms  p99 {latency['p99']}ms  errors {level['errors']}  "
+              f"upstream {level['upstream']['requests']}  cache hit rate {level['cache']['hit_rate']}")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.compare}:")
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
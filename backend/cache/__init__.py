@@ -1,42 +1,483 @@
 """Cache implementation for the movie recommendation app."""
-from cachetools import TTLCache
+import asyncio
+import copy
+from concurrent.futures import Future, ThreadPoolExecutor
 from functools import wraps
+import inspect
 import json
 import hashlib
-from config import CACHE_TTL, MAX_CACHE_SIZE
+import threading
+import time
+import weakref
+from config import (
+    CACHE_POLICIES, CACHE_DISK_PATH, CACHE_DISK_MAX_ENTRIES, CACHE_REFRESH_WORKERS
+)
+from cache.disk import DiskCache
+from cache.encoded import encode_response
+from cache.store import SizedTTLCache
+from utils.metrics import cache_requests, cache_evictions
 
-# Initialize cache with TTL and max size
-cache = TTLCache(maxsize=MAX_CACHE_SIZE, ttl=CACHE_TTL)
+# One TTL cache per policy, so short-lived and long-lived data don't compete for memory.
+# Each is budgeted in approximate bytes; entries are kept for ttl + stale_ttl +
+# stale_if_error and freshness is tracked on each entry.
+caches = {
+    name: SizedTTLCache(
+        maxsize=policy["max_bytes"],
+        ttl=policy["ttl"] + policy.get("stale_ttl", 0) + policy.get("stale_if_error", 0),
+        getsizeof=lambda entry: entry.size,
+        on_evict=lambda key, entry: cache_evictions.inc(entry.name)
+    )
+    for name, policy in CACHE_POLICIES.items()
+}
+cache = caches["default"]
+
+# Optional second tier checked on an in-memory miss before calling the function
+disk_cache = DiskCache(CACHE_DISK_PATH, CACHE_POLICIES["default"]["ttl"], CACHE_DISK_MAX_ENTRIES) if CACHE_DISK_PATH else None
+
+# Live entries by the identity of their value, so a value handed out by a cached
+# function finds its entry again when it is encoded for a response
+_entries_by_value = weakref.WeakValueDictionary()
+
+# TTLCache is not thread-safe, so every read and write goes through this lock
+_lock = threading.RLock()
+
+# Keys currently being computed, mapped to a Future that waiting callers share
+_in_flight = {}
+
+# Bounded pool for stale-while-revalidate refreshes
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+# Background refresh tasks started by cached_async wrappers
+_refresh_tasks = set()
+
+# Counters reported by get_cache_stats()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "coalesced": 0,
+    "disk_hits": 0,
+    "stale_hits": 0,
+    "refreshes": 0,
+    "stale_if_error": 0,
+    "negative_hits": 0,
+    "encoded_hits": 0,
+    "encoded_misses": 0
+}
+
+class Uncached:
+    """Wrap a return value to hand it to callers without storing it, e.g. a partial result."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+# Rough per-entry overhead (key, entry and cache bookkeeping) in bytes
+ENTRY_OVERHEAD = 200
+
+class _Entry:
+    """
+    A cached value, the monotonic times until which it is fresh, may be
+    served stale and is kept as the last known good value, and its size.
+
+    A negative entry holds an exception instead of a value, raised to
+    callers until it expires. ``encoded`` holds the value's encoded
+    response bodies once it has been served; they count towards its size.
+    """
+
+    __slots__ = (
+        "value", "fresh_until", "stale_until", "keep_until", "size", "name", "negative", "encoded", "home",
+        "__weakref__"
+    )
+
+    def __init__(self, value, fresh_until, name, stale_until=None, keep_until=None, negative=False):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = fresh_until if stale_until is None else stale_until
+        self.keep_until = self.stale_until if keep_until is None else keep_until
+        self.name = name
+        self.negative = negative
+        self.encoded = {}
+        # (store, key) of the entry once it is stored
+        self.home = None
+        self.size = _estimate_size(value) + ENTRY_OVERHEAD
+
+def _estimate_size(value):
+    """Approximate bytes held by a value."""
+    # The serialized length is a cheap, stable stand-in for the memory the value holds
+    try:
+        return len(json.dumps(value, default=repr))
+    except (TypeError, ValueError, RecursionError):
+        # Not JSON-serializable (e.g. non-string dict keys); repr is rougher but always works
+        return len(repr(value))
+
+def _normalize(value):
+    """Convert an argument into a JSON-friendly form that is equal for equal inputs."""
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_normalize(item) for item in value), key=repr)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
 
 def cache_key(*args, **kwargs):
     """Generate a cache key from function arguments."""
-    key = str(args) + str(sorted(kwargs.items()))
+    key = json.dumps([_normalize(args), _normalize(kwargs)], sort_keys=True)
     return hashlib.md5(key.encode()).hexdigest()
 
-def cached(func):
-    """Decorator to cache function results."""
+def _key_function(func, exclude, name):
+    """Build a function mapping call arguments to a cache key for func."""
+    signature = inspect.signature(func)
+    skip_self = next(iter(signature.parameters), None) == "self"
+    namespace = name or func.__name__
+
+    def make_key(args, kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        if skip_self:
+            arguments.pop("self")
+        for argument in exclude:
+            arguments.pop(argument, None)
+        return cache_key(namespace, **arguments)
+
+    return make_key
+
+# Outcomes of _lookup()
+_HIT = "hit"            # Serve the value
+_NEGATIVE = "negative"  # Raise the cached error (a copy of it)
+_REFRESH = "refresh"    # Serve the stale value and refresh it with the given Future
+_WAIT = "wait"          # Another caller is computing the value; wait on its Future
+_LEAD = "lead"          # Compute the value and publish it through the given Future
+
+# Fallback of a _LEAD outcome when there is no last known good value
+_NO_FALLBACK = object()
+
+def _lookup(store, key, name, can_refresh=True):
+    """
+    Look key up under the lock and return (outcome, value, future).
+
+    For _LEAD, value is the last known good value to serve if computing a
+    new one fails, or _NO_FALLBACK.
+    """
+    with _lock:
+        entry = store.get(key)
+        fallback = _NO_FALLBACK
+        now = time.monotonic()
+        if entry is not None and now >= entry.keep_until:
+            entry = None
+        if entry is not None and entry.negative:
+            if now < entry.fresh_until:
+                _stats["negative_hits"] += 1
+                cache_requests.inc(name, "negative")
+                return _NEGATIVE, entry.value, None
+        elif entry is not None and now >= entry.stale_until:
+            # Only kept to be served if reloading it fails
+            fallback = entry.value
+        elif entry is not None:
+            if now < entry.fresh_until:
+                _stats["hits"] += 1
+                cache_requests.inc(name, "hit")
+                return _HIT, entry.value, None
+
+            _stats["stale_hits"] += 1
+            cache_requests.inc(name, "stale")
+            if key in _in_flight or not can_refresh:
+                return _HIT, entry.value, None
+            _stats["refreshes"] += 1
+            future = _in_flight[key] = Future()
+            return _REFRESH, entry.value, future
+
+        future = _in_flight.get(key)
+        if future is not None:
+            _stats["coalesced"] += 1
+            cache_requests.inc(name, "coalesced")
+            return _WAIT, None, future
+
+        _stats["misses"] += 1
+        cache_requests.inc(name, "miss")
+        future = _in_flight[key] = Future()
+        return _LEAD, fallback, future
+
+def _disk_get(key):
+    """Check the disk tier for key."""
+    if not disk_cache:
+        return False, None
+    found, value = disk_cache.get(key)
+    if found:
+        with _lock:
+            _stats["disk_hits"] += 1
+    return found, value
+
+def _publish(store, key, future, result, policy, name):
+    """
+    Store a freshly computed result and hand it to every waiting caller.
+
+    The key always leaves the in-flight map and the future is always
+    resolved, with the error if storing the result fails. The entry is
+    built (and its value sized) before taking the lock, so serializing a
+    large payload doesn't stall other lookups.
+    """
+    try:
+        if isinstance(result, Uncached):
+            result = result.value
+        else:
+            fresh_until = time.monotonic() + policy["ttl"]
+            stale_until = fresh_until + policy.get("stale_ttl", 0)
+            entry = _Entry(result, fresh_until, name, stale_until, stale_until + policy.get("stale_if_error", 0))
+            with _lock:
+                try:
+                    store[key] = entry
+                    entry.home = (store, key)
+                    _entries_by_value[id(result)] = entry
+                except ValueError:
+                    # Larger than the policy's whole budget; serve it without caching
+                    store.pop(key, None)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(result)
+    finally:
+        with _lock:
+            _in_flight.pop(key, None)
+    return result
+
+def _fail(store, key, future, error, fallback, name):
+    """
+    Hand an error to every waiting caller, or the last known good value if
+    there is one.
+
+    Errors with a truthy ``negative_ttl`` attribute (such as TMDb 404s) are
+    cached for that many seconds.
+    """
+    with _lock:
+        _in_flight.pop(key, None)
+        if isinstance(error, Exception) and fallback is not _NO_FALLBACK:
+            _stats["stale_if_error"] += 1
+            cache_requests.inc(name, "stale_if_error")
+        elif getattr(error, "negative_ttl", 0):
+            try:
+                store[key] = _Entry(error, time.monotonic() + error.negative_ttl, name, negative=True)
+            except ValueError:
+                pass
+    if isinstance(error, Exception) and fallback is not _NO_FALLBACK:
+        future.set_result(fallback)
+        return True
+    future.set_exception(error)
+    return False
+
+def _cached_error(error):
+    """A copy of a cached error, so concurrent raises don't share a traceback."""
+    return copy.copy(error).with_traceback(None)
+
+def cached(func=None, *, policy="default", exclude=(), name=None):
+    """
+    Decorator to cache function results.
+
+    Can be used bare (``@cached``) or with a policy name from
+    ``CACHE_POLICIES`` (``@cached(policy="details")``) to pick the TTL and
+    capacity of the cache the results live in.
+
+    Keys are built from the function name (or ``name``) and the bound
+    arguments with defaults applied, so ``f(1)`` and ``f(1, page=1)`` share
+    an entry. A leading ``self`` is left out, which lets every instance of a
+    service share the same entries.
+
+    Concurrent misses on the same key are coalesced: the first caller runs
+    the function and every other caller waits for its result (or error)
+    instead of making its own upstream call. When the disk tier is enabled
+    it is checked before the function runs and filled after it returns.
+
+    If the policy has a ``stale_ttl``, an entry past its ``ttl`` keeps being
+    served for that long while a background worker refreshes it. Past that,
+    for the policy's ``stale_if_error`` seconds, it is only served when the
+    function raises. Errors with a ``negative_ttl`` attribute are cached and
+    re-raised for that many seconds.
+
+    Arguments named in ``exclude`` (such as latency budgets) don't affect
+    the key. A function can return ``Uncached(value)`` to pass a result to
+    its callers without caching it.
+    """
+    if func is None:
+        return lambda f: cached(f, policy=policy, exclude=exclude, name=name)
+
+    store = caches[policy]
+    settings = CACHE_POLICIES[policy]
+    ttl = settings["ttl"]
+    make_key = _key_function(func, exclude, name)
+    namespace = name or func.__name__
+
+    def load(key, future, args, kwargs, fallback=_NO_FALLBACK):
+        """Compute the value for key as the leading caller and publish it."""
+        try:
+            found, result = _disk_get(key)
+            if not found:
+                result = func(*args, **kwargs)
+                if disk_cache and not isinstance(result, Uncached):
+                    disk_cache.set(key, result, ttl=ttl)
+        except BaseException as e:
+            if _fail(store, key, future, e, fallback, namespace):
+                print(f"Serving last known good {func.__name__} after error: {e}")
+                return fallback
+            raise
+        return _publish(store, key, future, result, settings, namespace)
+
+    def refresh(key, future, args, kwargs, stale):
+        """Reload a stale entry in the background, keeping the old value on failure."""
+        load(key, future, args, kwargs, stale)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        key = cache_key(func.__name__, *args, **kwargs)
+        key = make_key(args, kwargs)
+        outcome, value, future = _lookup(store, key, namespace)
 
-        if key in cache:
-            return cache[key]
+        if outcome == _NEGATIVE:
+            raise _cached_error(value)
+        if outcome == _REFRESH:
+            _refresh_executor.submit(refresh, key, future, args, kwargs, value)
+        if outcome in (_HIT, _REFRESH):
+            return value
+        if outcome == _WAIT:
+            return future.result()
+        return load(key, future, args, kwargs, value)
 
-        result = func(*args, **kwargs)
-        cache[key] = result
-        return result
+    wrapper.cache_policy = policy
+    return wrapper
+
+def cached_async(func=None, *, policy="default", exclude=(), name=None):
+    """
+    Asyncio counterpart of ``cached`` for coroutine functions.
+
+    Uses the same caches, keys and in-flight map as ``cached``, so a
+    coroutine sharing a function's name (or given it via ``name``) shares
+    its entries, and sync and async callers coalesce onto each other.
+    Stale entries are refreshed in background tasks on the running loop,
+    at most ``CACHE_REFRESH_WORKERS`` at a time.
+    """
+    if func is None:
+        return lambda f: cached_async(f, policy=policy, exclude=exclude, name=name)
+
+    store = caches[policy]
+    settings = CACHE_POLICIES[policy]
+    ttl = settings["ttl"]
+    make_key = _key_function(func, exclude, name)
+    namespace = name or func.__name__
+
+    async def load(key, future, args, kwargs, fallback=_NO_FALLBACK):
+        """Compute the value for key as the leading caller and publish it."""
+        try:
+            found, result = await asyncio.to_thread(_disk_get, key) if disk_cache else (False, None)
+            if not found:
+                result = await func(*args, **kwargs)
+                if disk_cache and not isinstance(result, Uncached):
+                    await asyncio.to_thread(disk_cache.set, key, result, ttl)
+        except BaseException as e:
+            if _fail(store, key, future, e, fallback, namespace):
+                print(f"Serving last known good {func.__name__} after error: {e}")
+                return fallback
+            raise
+        return _publish(store, key, future, result, settings, namespace)
+
+    async def refresh(key, future, args, kwargs, stale):
+        """Reload a stale entry in the background, keeping the old value on failure."""
+        await load(key, future, args, kwargs, stale)
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = make_key(args, kwargs)
+        outcome, value, future = _lookup(store, key, namespace, len(_refresh_tasks) < CACHE_REFRESH_WORKERS)
+
+        if outcome == _NEGATIVE:
+            raise _cached_error(value)
+        if outcome == _REFRESH:
+            task = asyncio.ensure_future(refresh(key, future, args, kwargs, value))
+            _refresh_tasks.add(task)
+            task.add_done_callback(_refresh_tasks.discard)
+        if outcome in (_HIT, _REFRESH):
+            return value
+        if outcome == _WAIT:
+            return await asyncio.wrap_future(future)
+        return await load(key, future, args, kwargs, value)
 
+    wrapper.cache_policy = policy
     return wrapper
 
+def encoded_response(value, wrap=None, **extra):
+    """
+    Get the encoded JSON response (see ``cache.encoded``) for a value.
+
+    With ``wrap``, the body is ``{wrap: value, **extra}`` instead of the
+    value itself. When value was returned by a cached function and its
+    entry is still stored, the body is kept on the entry, so it is encoded
+    once, counts towards the policy's byte budget and is dropped with the
+    entry. Other values are encoded on every call. Extra values must be
+    hashable, and cached values must not be mutated.
+    """
+    variant = (wrap, tuple(sorted(extra.items())))
+    with _lock:
+        entry = _entries_by_value.get(id(value))
+        if entry is not None and entry.value is not value:
+            entry = None
+        if entry is not None and variant in entry.encoded:
+            _stats["encoded_hits"] += 1
+            return entry.encoded[variant]
+        _stats["encoded_misses"] += 1
+
+    encoded = encode_response(value, wrap, **extra)
+    if entry is None:
+        return encoded
+
+    with _lock:
+        store, key = entry.home
+        if variant not in entry.encoded and store.peek(key) is entry:
+            entry.encoded[variant] = encoded
+            entry.size += encoded.size
+            try:
+                # Setting the entry again re-measures it against the byte budget
+                store[key] = entry
+            except ValueError:
+                store.pop(key, None)
+    return encoded
+
 def clear_cache():
     """Clear the entire cache."""
-    cache.clear()
+    with _lock:
+        for store in caches.values():
+            store.clear()
+        _entries_by_value.clear()
+    if disk_cache:
+        disk_cache.clear()
 
 def get_cache_stats():
-    """Get cache statistics."""
-    return {
-        "size": len(cache),
-        "maxsize": cache.maxsize,
-        "ttl": cache.ttl,
-        "currsize": cache.currsize
-    }
+    """Get cache statistics, including approximate bytes used per cached function."""
+    with _lock:
+        functions = {}
+        for store in caches.values():
+            for entry in store.stored_values():
+                usage = functions.setdefault(entry.name, {"entries": 0, "bytes": 0})
+                usage["entries"] += 1
+                usage["bytes"] += entry.size
+
+        return {
+            "size": sum(len(store) for store in caches.values()),
+            "bytes": sum(store.currsize for store in caches.values()),
+            "policies": {
+                name: {
+                    "size": len(store),
+                    "bytes": store.currsize,
+                    "max_bytes": store.maxsize,
+                    "evictions": store.evictions,
+                    "ttl": CACHE_POLICIES[name]["ttl"],
+                    "stale_ttl": CACHE_POLICIES[name].get("stale_ttl", 0)
+                }
+                for name, store in caches.items()
+            },
+            "functions": functions,
+            "in_flight": len(_in_flight),
+            "disk": disk_cache.stats() if disk_cache else None,
+            **_stats
+        }
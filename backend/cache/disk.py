@@ -0,0 +1,117 @@
+"""SQLite-backed second cache tier shared by every worker on the host."""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class DiskCache:
+    """
+    TTL-aware, size-bounded key/value store in a local SQLite file.
+
+    Values are stored as JSON, so only JSON-serializable results are
+    persisted. Storage errors are treated as misses so a broken or locked
+    database never fails a request. Connections are opened on first use in
+    each thread of each process, never carried across ``fork``.
+    """
+
+    # Run eviction once every this many writes rather than on every write
+    EVICT_EVERY = 50
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _connect(self):
+        """Get this thread's connection in this process (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # A connection inherited from the parent process is abandoned, not closed
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            conn.commit()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        """Return (found, value) for a key that has not expired."""
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            return False, None
+
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """Store a value, silently skipping anything that is not JSON-serializable."""
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at)
+            )
+            conn.commit()
+        except sqlite3.Error:
+            return
+
+        with self._writes_lock:
+            self._writes += 1
+            should_evict = self._writes % self.EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the soonest-to-expire ones above max_entries."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        """Remove every entry."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM entries")
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        """Get disk tier statistics."""
+        try:
+            size = self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        return {
+            "path": self.path,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl
+        }
@@ -0,0 +1,32 @@
+"""Pre-encoded JSON response bodies of cached values."""
+import gzip
+import hashlib
+import json
+
+# Bodies smaller than this aren't worth compressing
+GZIP_MIN_BYTES = 1024
+
+class EncodedResponse:
+    """A JSON body, its gzip-compressed form and a content-hash ETag."""
+
+    __slots__ = ("body", "gzip_body", "etag")
+
+    def __init__(self, body):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = hashlib.md5(body).hexdigest()
+
+    @property
+    def size(self):
+        """Bytes held by the encoded bodies."""
+        return len(self.body) + len(self.gzip_body or b'')
+
+def encode_response(value, wrap=None, **extra):
+    """
+    Encode value as a compact JSON response.
+
+    With ``wrap``, the body is ``{wrap: value, **extra}`` instead of the
+    value itself, e.g. ``encode_response(movies, wrap='results')``.
+    """
+    document = {wrap: value, **extra} if wrap else value
+    return EncodedResponse(json.dumps(document, separators=(',', ':'), sort_keys=True).encode('utf-8'))
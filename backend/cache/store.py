@@ -0,0 +1,84 @@
+"""Byte-budgeted TTL cache with size-aware eviction."""
+from collections import OrderedDict
+from cachetools import Cache, TTLCache
+
+class SizedTTLCache(TTLCache):
+    """
+    TTLCache whose ``maxsize`` is a budget in bytes rather than entries.
+
+    Each value reports its own size through ``getsizeof``. When the budget
+    is exceeded, the largest of the ``eviction_sample`` least recently used
+    entries is evicted first, so a large cold payload goes before small hot
+    ones without scanning the whole cache.
+
+    ``on_evict(key, value)`` is called for every entry evicted for space
+    (not for expired entries).
+
+    Not thread-safe, like TTLCache; callers hold a lock.
+    """
+
+    def __init__(self, maxsize, ttl, getsizeof, eviction_sample=8, on_evict=None):
+        super().__init__(maxsize, ttl, getsizeof=getsizeof)
+        self.eviction_sample = eviction_sample
+        self.on_evict = on_evict
+        self.evictions = 0
+        # Access order of keys, least recently used first. Keys dropped by
+        # TTLCache.expire() bypass __delitem__ and are pruned lazily.
+        self._recency = OrderedDict()
+
+    def _present(self, key):
+        """Whether key is still stored, without touching its recency."""
+        return Cache.__contains__(self, key)
+
+    def _prune(self):
+        """Forget keys that expired since they were last used."""
+        if len(self._recency) > 2 * Cache.__len__(self) + 64:
+            self._recency = OrderedDict((key, None) for key in self._recency if self._present(key))
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if key in self._recency:
+            self._recency.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._recency[key] = None
+        self._recency.move_to_end(key)
+        self._prune()
+
+    def __delitem__(self, key):
+        try:
+            super().__delitem__(key)
+        finally:
+            self._recency.pop(key, None)
+
+    def popitem(self):
+        """Evict the largest of the least recently used entries."""
+        self.expire()
+        sample = []
+        for key in list(self._recency):
+            if not self._present(key):
+                del self._recency[key]
+                continue
+            sample.append(key)
+            if len(sample) == self.eviction_sample:
+                break
+        if not sample:
+            raise KeyError(f"{type(self).__name__} is empty")
+
+        victim = max(sample, key=lambda key: self.getsizeof(Cache.__getitem__(self, key)))
+        self.evictions += 1
+        value = Cache.__getitem__(self, victim)
+        del self[victim]
+        if self.on_evict:
+            self.on_evict(victim, value)
+        return victim, value
+
+    def peek(self, key):
+        """Stored value for key, or None, without touching recency or expiring anything."""
+        return Cache.__getitem__(self, key) if self._present(key) else None
+
+    def stored_values(self):
+        """Every stored value, without touching recency or expiring anything."""
+        return [Cache.__getitem__(self, key) for key in Cache.__iter__(self)]
@@ -7,12 +7,113 @@ load_dotenv("h.env")
 
 # API Configuration
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
-TMDB_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3")  # Point at benchmarks/fake_tmdb.py for offline runs
 TMDB_IMAGE_BASE_URL = "https://image.tmdb.org/t/p/w500"
 
+# Upstream HTTP Configuration
+TMDB_POOL_SIZE = int(os.getenv("TMDB_POOL_SIZE", 20))  # Keep-alive connections per worker
+TMDB_ASYNC_MAX_CONNECTIONS = int(os.getenv("TMDB_ASYNC_MAX_CONNECTIONS", 100))  # Concurrent async requests per worker
+TMDB_CONNECT_TIMEOUT = float(os.getenv("TMDB_CONNECT_TIMEOUT", 3.05))
+TMDB_READ_TIMEOUT = float(os.getenv("TMDB_READ_TIMEOUT", 10))
+TMDB_MAX_RETRIES = int(os.getenv("TMDB_MAX_RETRIES", 3))
+TMDB_BACKOFF_BASE = float(os.getenv("TMDB_BACKOFF_BASE", 0.5))  # Seconds, doubled per retry
+TMDB_BACKOFF_MAX = float(os.getenv("TMDB_BACKOFF_MAX", 8))
+
+# TMDb rate limit budget (40 requests per 10 seconds), shared by every service instance.
+# Set TMDB_RATE_LIMIT_FILE to a local path to share the budget across worker processes.
+TMDB_RATE_LIMIT_REQUESTS = int(os.getenv("TMDB_RATE_LIMIT_REQUESTS", 40))
+TMDB_RATE_LIMIT_PERIOD = float(os.getenv("TMDB_RATE_LIMIT_PERIOD", 10))
+TMDB_RATE_LIMIT_FILE = os.getenv("TMDB_RATE_LIMIT_FILE")
+
+# Circuit breaker: fail fast after this many consecutive upstream failures,
+# then let a trial request through every TMDB_BREAKER_RESET seconds
+TMDB_BREAKER_FAILURES = int(os.getenv("TMDB_BREAKER_FAILURES", 5))
+TMDB_BREAKER_RESET = float(os.getenv("TMDB_BREAKER_RESET", 30))
+
 # Cache Configuration
 CACHE_TTL = int(os.getenv("CACHE_TTL", 3600))  # Default: 1 hour
-MAX_CACHE_SIZE = 1000  # Maximum number of items in cache
+# Approximate memory budget of the default cache policy, in bytes of serialized JSON
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 64 * 1024 * 1024))  # Default: 64 MB
+# Seconds an expired value is kept as the last known good one, served when reloading it fails
+CACHE_STALE_IF_ERROR = int(os.getenv("CACHE_STALE_IF_ERROR", 86400))
+# Seconds TMDb "not found" and "invalid request" errors (404, 422) are cached
+NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", 300))
+
+# Per-function cache policies, selected with @cached(policy=...).
+# "max_bytes" bounds the approximate serialized size of all entries of a policy.
+# "stale_ttl" is a grace window after "ttl" during which the expired value
+# is still served while a background worker refreshes it.
+# "stale_if_error" keeps the value for that much longer again, served only
+# when reloading it fails (e.g. while the TMDb circuit breaker is open).
+CACHE_POLICIES = {
+    "default": {"ttl": CACHE_TTL, "max_bytes": CACHE_MAX_BYTES, "stale_if_error": CACHE_STALE_IF_ERROR},
+    # Trending lists change during the day, so keep them short-lived
+    "trending": {
+        "ttl": int(os.getenv("TRENDING_CACHE_TTL", 900)),
+        "max_bytes": 2 * 1024 * 1024,
+        "stale_ttl": 3600,
+        "stale_if_error": CACHE_STALE_IF_ERROR
+    },
+    # Movie details and credits rarely change once published
+    "details": {
+        "ttl": int(os.getenv("DETAILS_CACHE_TTL", 86400)),
+        "max_bytes": int(os.getenv("DETAILS_CACHE_MAX_BYTES", 128 * 1024 * 1024)),
+        "stale_ttl": 86400,
+        "stale_if_error": CACHE_STALE_IF_ERROR
+    },
+    # Autocomplete sees many distinct prefixes, each with a small payload
+    "autocomplete": {"ttl": CACHE_TTL, "max_bytes": 8 * 1024 * 1024},
+}
+
+# Optional on-disk second tier shared by all workers (disabled when unset)
+CACHE_DISK_PATH = os.getenv("CACHE_DISK_PATH")
+CACHE_DISK_MAX_ENTRIES = int(os.getenv("CACHE_DISK_MAX_ENTRIES", 20000))
+
+
+# Maximum number of stale entries refreshed in the background at once
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", 2))
+
+# Recommendation Configuration
+RECOMMENDATION_FETCH_WORKERS = int(os.getenv("RECOMMENDATION_FETCH_WORKERS", 8))  # Concurrent candidate detail fetches
+# Default latency budget for candidate detail fetches (no budget when unset)
+RECOMMENDATION_BUDGET_MS = int(os.getenv("RECOMMENDATION_BUDGET_MS")) if os.getenv("RECOMMENDATION_BUDGET_MS") else None
+RECOMMENDATION_SEED_WORKERS = int(os.getenv("RECOMMENDATION_SEED_WORKERS", 8))  # Concurrent hybrid seeds (sync path)
+# Default deadline for hybrid recommendations, after which finished seeds are returned (no deadline when unset)
+RECOMMENDATION_HYBRID_TIMEOUT_MS = int(os.getenv("RECOMMENDATION_HYBRID_TIMEOUT_MS")) if os.getenv("RECOMMENDATION_HYBRID_TIMEOUT_MS") else None
+# Incremental recommendation sessions kept per store, evicted least recently used first
+RECOMMENDATION_SESSION_MAX = int(os.getenv("RECOMMENDATION_SESSION_MAX", 1000))
+RECOMMENDATION_SESSION_TTL = int(os.getenv("RECOMMENDATION_SESSION_TTL", 1800))  # Seconds a session may sit idle
+# SQLite file holding sessions, shared by every worker on the host (per-process when unset)
+RECOMMENDATION_SESSION_PATH = os.getenv("RECOMMENDATION_SESSION_PATH")
+
+# Warm the cache in the background at startup with trending movies, their details and recommendations
+CACHE_WARMUP = os.getenv("CACHE_WARMUP", "false").lower() in ("1", "true", "yes")
+CACHE_WARMUP_MOVIES = int(os.getenv("CACHE_WARMUP_MOVIES", 20))  # Trending movies warmed
+# Prefetch recommendations for movies whose details are requested, while the rate limiter has spare tokens
+PREFETCH_RECOMMENDATIONS = os.getenv("PREFETCH_RECOMMENDATIONS", "false").lower() in ("1", "true", "yes")
+PREFETCH_MIN_TOKENS = float(os.getenv("PREFETCH_MIN_TOKENS", 20))
+PREFETCH_MAX_PENDING = int(os.getenv("PREFETCH_MAX_PENDING", 50))
+# Prefetch the next page of a movie search into the cache when a page is served, budget permitting
+PREFETCH_SEARCH_PAGES = os.getenv("PREFETCH_SEARCH_PAGES", "true").lower() in ("1", "true", "yes")
+
+# Search Configuration
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", 5))  # TMDb pages merged into one multi-page search response
+
+# Autocomplete Configuration
+AUTOCOMPLETE_LIMIT = 10  # Suggestions returned per query
+# Optional JSON-lines title dump (e.g. a TMDb daily ID export) loaded into the autocomplete index at startup
+TITLE_INDEX_FILE = os.getenv("TITLE_INDEX_FILE")
+
+# Local movie catalog file, memory-mapped and shared by all workers (in-process only when unset)
+CATALOG_PATH = os.getenv("CATALOG_PATH")
+# Precomputed item-item neighbor index built from the catalog by utils/neighbor_index.py (unused when unset)
+NEIGHBOR_INDEX_PATH = os.getenv("NEIGHBOR_INDEX_PATH")
+
+# Region used for watch providers when a single-movie or batch request doesn't name one
+DEFAULT_WATCH_REGION = os.getenv("DEFAULT_WATCH_REGION", "US")
+
+# Maximum number of ids accepted by batch endpoints
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", 100))
 
 # App Configuration
 DEBUG = os.getenv("FLASK_ENV") == "development"
@@ -0,0 +1,292 @@
+"""Asyncio counterpart of TMDbService for routes that fan out many calls."""
+import asyncio
+import threading
+import time
+import httpx
+from config import (
+    TMDB_API_KEY, TMDB_BASE_URL, TMDB_IMAGE_BASE_URL,
+    TMDB_POOL_SIZE, TMDB_ASYNC_MAX_CONNECTIONS, TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT,
+    TMDB_MAX_RETRIES, TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX, SEARCH_MAX_PAGES
+)
+from cache import cached_async
+from services.http_client import RETRY_STATUSES, backoff_delay, retry_after_delay
+from services.tmdb_service import (
+    TMDbError, CircuitOpenError, rate_limiter, circuit_breaker, record_response,
+    filter_watch_providers, compact_watch_providers
+)
+from utils.title_index import title_index
+from utils.catalog import movie_catalog
+from utils.metrics import endpoint_label, upstream_requests, upstream_latency
+
+# Fields kept in slim movie payloads, enough to render a movie card
+CARD_FIELDS = (
+    'id', 'title', 'overview', 'poster_path', 'poster_url', 'backdrop_path',
+    'release_date', 'vote_average', 'vote_count', 'popularity', 'genres', 'runtime'
+)
+
+# TMDb serves search results 20 per page, up to page 500
+SEARCH_PAGE_SIZE = 20
+SEARCH_LAST_PAGE = 500
+
+# A single long-lived event loop per process runs all async TMDb I/O. Flask
+# runs each async view in its own short-lived loop, so connections and
+# background tasks live here instead, where they outlast the request.
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_io_loop():
+    """Get the shared I/O event loop, starting its thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="tmdb-io-loop", daemon=True).start()
+        return _loop
+
+def submit(coro):
+    """Schedule a coroutine on the I/O loop and return a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_io_loop())
+
+async def run(coro):
+    """Run a coroutine on the I/O loop and await its result from any other loop."""
+    return await asyncio.wrap_future(submit(coro))
+
+# Shared by every AsyncTMDbService instance; created on the I/O loop on first use
+_client = None
+
+def _get_client():
+    """Get the pooled async HTTP client."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=TMDB_ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=TMDB_POOL_SIZE
+            ),
+            timeout=httpx.Timeout(TMDB_READ_TIMEOUT, connect=TMDB_CONNECT_TIMEOUT)
+        )
+    return _client
+
+class AsyncTMDbService:
+    """
+    Async TMDb client sharing TMDbService's caches and rate limiter.
+
+    Cached methods have the same names and arguments as their TMDbService
+    counterparts, so both services read and fill the same cache entries.
+    Methods must be awaited on the I/O loop (see ``run``/``submit``).
+    """
+
+    def __init__(self):
+        self.api_key = TMDB_API_KEY
+        self.base_url = TMDB_BASE_URL
+        self.image_base_url = TMDB_IMAGE_BASE_URL
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.request_count = 0
+
+    async def _make_request(self, endpoint, params=None):
+        """Make a rate-limited request to the TMDb API, retrying like HTTPClient."""
+        if params is None:
+            params = {}
+
+        params['api_key'] = self.api_key
+
+        url = f"{self.base_url}/{endpoint}"
+        client = _get_client()
+        label = endpoint_label(endpoint)
+        if not self.circuit_breaker.allow():
+            upstream_requests.inc(label, "circuit_open")
+            raise CircuitOpenError("TMDb is unavailable: too many recent failures")
+        waited = 0
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self.rate_limiter.reserve()
+            waited += wait
+            await asyncio.sleep(wait)
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError as e:
+                if attempt >= TMDB_MAX_RETRIES:
+                    self.circuit_breaker.record_failure()
+                    upstream_requests.inc(label, "error")
+                    upstream_latency.observe(time.monotonic() - started - waited, label)
+                    # The exception text can include the request URL, and with it the API key
+                    raise TMDbError(f"Error connecting to TMDb: {type(e).__name__}") from e
+                delay = backoff_delay(attempt, TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= TMDB_MAX_RETRIES:
+                    break
+                delay = retry_after_delay(response.headers, TMDB_BACKOFF_MAX)
+                if delay is None:
+                    delay = backoff_delay(attempt, TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        record_response(self.circuit_breaker, response.status_code)
+        upstream_requests.inc(label, str(response.status_code))
+        upstream_latency.observe(time.monotonic() - started - waited, label)
+        self.request_count += 1
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            error_message = f"Error {response.status_code}: {response.text}"
+            raise TMDbError(error_message, response.status_code)
+
+    def _add_poster_urls(self, movies):
+        """Add a full poster URL to each movie in place."""
+        for movie in movies:
+            if movie.get('poster_path'):
+                movie['poster_url'] = f"{self.image_base_url}{movie['poster_path']}"
+            else:
+                movie['poster_url'] = None
+
+    @cached_async
+    async def search_movies(self, query, page=1):
+        """Search for movies matching a query."""
+        endpoint = "search/movie"
+        params = {
+            'query': query,
+            'page': page,
+            'include_adult': 'false'
+        }
+
+        results = await self._make_request(endpoint, params)
+        self._add_poster_urls(results.get('results', []))
+        title_index.add_movies(results.get('results', []))
+        if page == 1 and results.get('total_pages', 0) <= 1:
+            title_index.mark_complete(query)
+        return results
+
+    async def search_movies_pages(self, query, page=1, pages=1, limit=None):
+        """
+        Search for movies across consecutive result pages, starting at page.
+
+        ``limit`` asks for that many results instead of a number of pages;
+        either is capped at SEARCH_MAX_PAGES pages. The first page is fetched
+        first to learn how many pages exist, then the rest concurrently
+        through the cached ``search_movies``. Results are merged in page
+        order, dropping movies repeated across pages.
+        """
+        if limit:
+            pages = -(-limit // SEARCH_PAGE_SIZE)
+        pages = max(1, min(pages, SEARCH_MAX_PAGES))
+
+        first = await self.search_movies(query, page)
+        total_pages = first.get('total_pages', 0)
+        last_page = max(page, min(page + pages - 1, total_pages, SEARCH_LAST_PAGE))
+        rest = await asyncio.gather(*(self.search_movies(query, number) for number in range(page + 1, last_page + 1)))
+
+        seen = set()
+        results = []
+        for result_page in (first, *rest):
+            for movie in result_page.get('results', []):
+                if movie['id'] not in seen:
+                    seen.add(movie['id'])
+                    results.append(movie)
+
+        return {
+            'page': page,
+            'last_page': last_page,
+            'results': results[:limit] if limit else results,
+            'total_pages': total_pages,
+            'total_results': first.get('total_results', 0)
+        }
+
+    @cached_async(policy="details")
+    async def get_movie_details(self, movie_id):
+        """Get detailed information about a movie."""
+        endpoint = f"movie/{movie_id}"
+        params = {
+            'append_to_response': 'credits,videos,keywords'
+        }
+
+        movie = await self._make_request(endpoint, params)
+        self._add_poster_urls([movie])
+        title_index.add_movies([movie])
+        movie_catalog.add_details(movie)
+        return movie
+
+    @cached_async
+    async def get_movie_recommendations(self, movie_id, page=1):
+        """Get movie recommendations based on a movie."""
+        endpoint = f"movie/{movie_id}/recommendations"
+        params = {
+            'page': page
+        }
+
+        results = await self._make_request(endpoint, params)
+        self._add_poster_urls(results.get('results', []))
+        title_index.add_movies(results.get('results', []))
+        return results
+
+    async def get_movie_details_batch(self, movie_ids, slim=False):
+        """
+        Get details for several movies at once.
+
+        Ids are deduplicated, cached details are served without an upstream
+        call, and misses are fetched concurrently under the shared rate
+        limit. Returns the movies found (in request order) and a dict of
+        per-id error messages. With ``slim``, only CARD_FIELDS are kept.
+        """
+        unique_ids = list(dict.fromkeys(movie_ids))
+        details = await asyncio.gather(
+            *(self.get_movie_details(movie_id) for movie_id in unique_ids),
+            return_exceptions=True
+        )
+
+        results = []
+        errors = {}
+        for movie_id, movie in zip(unique_ids, details):
+            if isinstance(movie, Exception):
+                errors[str(movie_id)] = str(movie)
+            elif slim:
+                results.append({field: movie.get(field) for field in CARD_FIELDS})
+            else:
+                results.append(movie)
+
+        return {'results': results, 'errors': errors}
+
+    @cached_async(policy="trending")
+    async def get_trending_movies(self, time_window='week'):
+        """Get trending movies for the day or week."""
+        if time_window not in ['day', 'week']:
+            time_window = 'week'
+
+        endpoint = f"trending/movie/{time_window}"
+
+        results = await self._make_request(endpoint)
+        self._add_poster_urls(results.get('results', []))
+        title_index.add_movies(results.get('results', []))
+        return results
+
+    @cached_async
+    async def get_movie_watch_providers(self, movie_id, region=None):
+        """Get watch provider information for a movie, for one region or all of them."""
+        endpoint = f"movie/{movie_id}/watch/providers"
+        return filter_watch_providers(await self._make_request(endpoint), region)
+
+    async def get_watch_providers_batch(self, movie_ids, region):
+        """
+        Get compact watch providers in one region for several movies at once.
+
+        Misses are fetched concurrently under the shared rate limit. Returns a
+        dict of movie id to compact providers (None when the movie has none
+        in the region) and a dict of per-id error messages.
+        """
+        unique_ids = list(dict.fromkeys(movie_ids))
+        providers = await asyncio.gather(
+            *(self.get_movie_watch_providers(movie_id, region) for movie_id in unique_ids),
+            return_exceptions=True
+        )
+
+        results = {}
+        errors = {}
+        for movie_id, movie_providers in zip(unique_ids, providers):
+            if isinstance(movie_providers, Exception):
+                errors[str(movie_id)] = str(movie_providers)
+            else:
+                results[str(movie_id)] = compact_watch_providers(movie_providers, region)
+
+        return {'region': region, 'results': results, 'errors': errors}
@@ -0,0 +1,89 @@
+"""Circuit breaker that stops calling an upstream API while it keeps failing."""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker shared by service instances.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    ``allow()`` returns False, so callers fail fast instead of queuing on a
+    broken upstream. After ``reset_timeout`` seconds one trial request is
+    let through (half-open): its success closes the circuit, its failure
+    opens it again for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_started = None
+        self._stats = {
+            "opened": 0,
+            "rejected": 0
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """Whether a request may be sent now; counts it as rejected if not."""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self._state = HALF_OPEN
+                self._trial_started = None
+            # A single trial request at a time; a trial that never reported back
+            # (e.g. its caller was cancelled) is replaced after reset_timeout
+            if self._state == HALF_OPEN and (
+                self._trial_started is None or now - self._trial_started >= self.reset_timeout
+            ):
+                self._trial_started = now
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        """Report a request the upstream answered properly; closes the circuit."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_started = None
+
+    def record_failure(self):
+        """Report a failed request; opens the circuit at the threshold or on a failed trial."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._trial_started = None
+                self._stats["opened"] += 1
+
+    def stats(self):
+        """Get the circuit state, consecutive failures and open/reject counts."""
+        state = self.state
+        with self._lock:
+            stats = dict(self._stats)
+            stats["consecutive_failures"] = self._failures
+            stats["retry_in"] = (
+                round(max(self._opened_at + self.reset_timeout - time.monotonic(), 0), 3)
+                if self._state == OPEN else None
+            )
+        stats["state"] = state
+        stats["failure_threshold"] = self.failure_threshold
+        stats["reset_timeout"] = self.reset_timeout
+        return stats
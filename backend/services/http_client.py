@@ -0,0 +1,115 @@
+"""Pooled HTTP client with timeouts and retries for upstream APIs."""
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter exponential backoff for the given attempt number."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def retry_after_delay(headers, cap):
+    """Parse a Retry-After header (seconds or HTTP date), capped at cap."""
+    header = headers.get("Retry-After")
+    if not header:
+        return None
+
+    try:
+        delay = float(header)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(header).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+
+    return min(max(delay, 0), cap)
+
+class HTTPClient:
+    """
+    Keep-alive HTTP client shared by service instances.
+
+    Connections are pooled per host, every request has connect/read
+    timeouts, and failed attempts are retried with jittered exponential
+    backoff that honors the server's Retry-After header.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 max_retries=3, backoff_base=0.5, backoff_max=8):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=False, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0
+        }
+
+    def get(self, url, params=None, before_attempt=None):
+        """
+        GET a URL, retrying connection errors, timeouts and retryable statuses.
+
+        ``before_attempt`` is called before every attempt, including retries,
+        so callers can apply rate limiting per upstream request. The last
+        response is returned once retries run out; connection errors and
+        timeouts are re-raised.
+        """
+        attempt = 0
+        while True:
+            if before_attempt:
+                before_attempt()
+
+            with self._lock:
+                self._stats["requests"] += 1
+
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._stats["errors"] += 1
+                    raise
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = retry_after_delay(response.headers, self.backoff_max)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+            with self._lock:
+                self._stats["retries"] += 1
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self):
+        """Get request, retry and connection reuse statistics."""
+        connections = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+
+        with self._lock:
+            stats = dict(self._stats)
+
+        stats["connections_opened"] = connections
+        stats["connection_reuse_ratio"] = (
+            round(1 - connections / pooled_requests, 3) if pooled_requests else None
+        )
+        return stats
@@ -0,0 +1,119 @@
+"""Token-bucket rate limiter for upstream API requests."""
+import fcntl
+import os
+import struct
+import threading
+import time
+from utils.metrics import rate_limit_wait
+
+class TokenBucket:
+    """
+    Thread-safe token bucket allowing bursts of up to ``capacity`` requests
+    and refilling at ``capacity / period`` tokens per second.
+
+    Callers reserve a token with ``reserve()`` and sleep for the returned
+    delay, so waiting happens outside the lock and the bucket can go into
+    debt when many callers arrive at once.
+
+    When ``state_path`` is given, the bucket state lives in that file and is
+    updated under an exclusive ``flock``, so every worker process on the
+    host shares one budget. Each process opens the file itself on first
+    use: a descriptor inherited across ``fork`` (e.g. ``gunicorn --preload``)
+    shares its lock with the parent, so flock wouldn't exclude the workers.
+    """
+
+    # Bucket state in the shared file: tokens, last refill time
+    _STATE = struct.Struct("dd")
+
+    def __init__(self, capacity, period, state_path=None):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.time()
+        self._fd = None
+        self._pid = None
+        self._stats = {
+            "acquired": 0,
+            "waited": 0,
+            "wait_seconds": 0.0
+        }
+
+    def _file(self):
+        """This process's descriptor for the state file, opened on first use after a fork."""
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _take(self, now):
+        """Refill for the time elapsed, take one token and return the wait needed."""
+        elapsed = max(now - self._updated, 0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def _load_shared(self, fd, now):
+        """Load the state stored in the shared file; the caller holds its flock."""
+        raw = os.pread(fd, self._STATE.size, 0)
+        if len(raw) == self._STATE.size:
+            self._tokens, self._updated = self._STATE.unpack(raw)
+        else:
+            self._tokens, self._updated = self.capacity, now
+
+    def _take_shared(self, now):
+        """Like _take, but on the state stored in the shared file."""
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            self._load_shared(fd, now)
+            delay = self._take(now)
+            os.pwrite(fd, self._STATE.pack(self._tokens, self._updated), 0)
+            return delay
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def reserve(self):
+        """Reserve one request and return how many seconds to wait before sending it."""
+        with self._lock:
+            now = time.time()
+            delay = self._take_shared(now) if self.state_path else self._take(now)
+            self._stats["acquired"] += 1
+            if delay > 0:
+                self._stats["waited"] += 1
+                self._stats["wait_seconds"] += delay
+        rate_limit_wait.observe(delay)
+        return delay
+
+    def acquire(self):
+        """Block until a request is allowed; return the time spent waiting."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def available(self):
+        """Approximate number of tokens available right now, across workers when shared."""
+        with self._lock:
+            now = time.time()
+            if self.state_path:
+                fd = self._file()
+                fcntl.flock(fd, fcntl.LOCK_SH)
+                try:
+                    self._load_shared(fd, now)
+                finally:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            elapsed = max(now - self._updated, 0)
+            return min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def stats(self):
+        """Get limiter configuration and wait statistics."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        stats["capacity"] = self.capacity
+        stats["rate_per_second"] = self.rate
+        stats["shared"] = bool(self.state_path)
+        return stats
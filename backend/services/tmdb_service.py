@@ -1,9 +1,89 @@
 """Service for interacting with the TMDb API."""
 import requests
-from urllib.parse import quote
 import time
-from config import TMDB_API_KEY, TMDB_BASE_URL, TMDB_IMAGE_BASE_URL
+from urllib.parse import quote
+from config import (
+    TMDB_API_KEY, TMDB_BASE_URL, TMDB_IMAGE_BASE_URL,
+    TMDB_POOL_SIZE, TMDB_CONNECT_TIMEOUT, TMDB_READ_TIMEOUT,
+    TMDB_MAX_RETRIES, TMDB_BACKOFF_BASE, TMDB_BACKOFF_MAX,
+    TMDB_RATE_LIMIT_REQUESTS, TMDB_RATE_LIMIT_PERIOD, TMDB_RATE_LIMIT_FILE,
+    TMDB_BREAKER_FAILURES, TMDB_BREAKER_RESET, NEGATIVE_CACHE_TTL, AUTOCOMPLETE_LIMIT
+)
 from cache import cached
+from services.circuit_breaker import CircuitBreaker
+from services.http_client import HTTPClient, RETRY_STATUSES
+from services.rate_limiter import TokenBucket
+from utils.title_index import title_index
+from utils.catalog import movie_catalog
+from utils.metrics import endpoint_label, upstream_requests, upstream_latency
+
+# Shared by every TMDbService instance so they draw from one connection pool
+http_client = HTTPClient(
+    pool_size=TMDB_POOL_SIZE,
+    connect_timeout=TMDB_CONNECT_TIMEOUT,
+    read_timeout=TMDB_READ_TIMEOUT,
+    max_retries=TMDB_MAX_RETRIES,
+    backoff_base=TMDB_BACKOFF_BASE,
+    backoff_max=TMDB_BACKOFF_MAX
+)
+
+# Shared by every TMDbService instance so they stay within one request budget
+rate_limiter = TokenBucket(TMDB_RATE_LIMIT_REQUESTS, TMDB_RATE_LIMIT_PERIOD, TMDB_RATE_LIMIT_FILE)
+
+# Shared by every TMDbService and AsyncTMDbService instance, so they stop calling TMDb together
+circuit_breaker = CircuitBreaker(TMDB_BREAKER_FAILURES, TMDB_BREAKER_RESET)
+
+# Statuses for an unknown movie or an invalid request, cached for NEGATIVE_CACHE_TTL
+NEGATIVE_CACHE_STATUSES = {404, 422}
+
+# Person filmographies are paged like TMDb result lists
+PERSON_MOVIES_PAGE_SIZE = 20
+
+# Fields kept for each provider in compact watch provider payloads
+PROVIDER_FIELDS = ('provider_id', 'provider_name', 'logo_path')
+
+def filter_watch_providers(providers, region=None):
+    """Keep only one region (e.g. "US") of a watch providers payload; all regions when region is None."""
+    if region is None:
+        return providers
+    results = providers.get('results', {})
+    return {
+        'id': providers.get('id'),
+        'results': {region: results[region]} if region in results else {}
+    }
+
+def compact_watch_providers(providers, region):
+    """A region's watch providers with only PROVIDER_FIELDS per provider, or None if it has none."""
+    offers = providers.get('results', {}).get(region)
+    if not offers:
+        return None
+    compact = {'link': offers.get('link')}
+    for kind in ('flatrate', 'rent', 'buy', 'free', 'ads'):
+        if offers.get(kind):
+            compact[kind] = [{field: provider.get(field) for field in PROVIDER_FIELDS} for provider in offers[kind]]
+    return compact
+
+class TMDbError(Exception):
+    """Raised when a TMDb request fails; status_code is None for network errors."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def negative_ttl(self):
+        """Seconds the cache may keep this error instead of asking TMDb again."""
+        return NEGATIVE_CACHE_TTL if self.status_code in NEGATIVE_CACHE_STATUSES else 0
+
+class CircuitOpenError(TMDbError):
+    """Raised without calling TMDb while the circuit breaker is open."""
+
+def record_response(breaker, status_code):
+    """Report an upstream response to the breaker; rate limiting and 5xx count as failures."""
+    if status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
 
 class TMDbService:
     """Service class for TMDb API operations."""
@@ -12,30 +92,59 @@ class TMDbService:
         self.api_key = TMDB_API_KEY
         self.base_url = TMDB_BASE_URL
         self.image_base_url = TMDB_IMAGE_BASE_URL
+        self.http = http_client
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
         self.request_count = 0
-        self.last_request_time = 0
 
     def _make_request(self, endpoint, params=None):
-        """Make a rate-limited request to the TMDb API."""
-        # Basic rate limiting (40 requests per 10 seconds)
-        current_time = time.time()
-        if current_time - self.last_request_time < 0.25:  # Limit to ~4 requests per second
-            time.sleep(0.25 - (current_time - self.last_request_time))
-
+        """Make a rate-limited request to the TMDb API, failing fast while the circuit is open."""
         if params is None:
             params = {}
 
         params['api_key'] = self.api_key
 
         url = f"{self.base_url}/{endpoint}"
-        response = requests.get(url, params=params)
-        self.last_request_time = time.time()
+        label = endpoint_label(endpoint)
+        if not self.circuit_breaker.allow():
+            upstream_requests.inc(label, "circuit_open")
+            raise CircuitOpenError("TMDb is unavailable: too many recent failures")
+        waits = []
+
+        def before_attempt():
+            waits.append(self.rate_limiter.acquire())
+
+        started = time.monotonic()
+        try:
+            response = self.http.get(url, params=params, before_attempt=before_attempt)
+        except requests.RequestException as e:
+            self.circuit_breaker.record_failure()
+            upstream_requests.inc(label, "error")
+            # The exception text includes the request URL, and with it the API key
+            raise TMDbError(f"Error connecting to TMDb: {type(e).__name__}") from e
+        finally:
+            upstream_latency.observe(time.monotonic() - started - sum(waits), label)
+        record_response(self.circuit_breaker, response.status_code)
+        upstream_requests.inc(label, str(response.status_code))
+        self.request_count += 1
 
         if response.status_code == 200:
             return response.json()
         else:
             error_message = f"Error {response.status_code}: {response.text}"
-            raise Exception(error_message)
+            raise TMDbError(error_message, response.status_code)
+
+    def get_http_stats(self):
+        """Get upstream connection pool and retry statistics."""
+        return self.http.stats()
+
+    def get_rate_limit_stats(self):
+        """Get rate limiter wait statistics."""
+        return self.rate_limiter.stats()
+
+    def get_circuit_stats(self):
+        """Get circuit breaker state and statistics."""
+        return self.circuit_breaker.stats()
 
     @cached
     def search_movies(self, query, page=1):
@@ -56,9 +165,13 @@ class TMDbService:
             else:
                 movie['poster_url'] = None
 
+        title_index.add_movies(results.get('results', []))
+        if page == 1 and results.get('total_pages', 0) <= 1:
+            title_index.mark_complete(query)
+
         return results
 
-    @cached
+    @cached(policy="details")
     def get_movie_details(self, movie_id):
         """Get detailed information about a movie."""
         endpoint = f"movie/{movie_id}"
@@ -74,6 +187,8 @@ class TMDbService:
         else:
             movie['poster_url'] = None
 
+        title_index.add_movies([movie])
+        movie_catalog.add_details(movie)
         return movie
 
     @cached
@@ -93,9 +208,10 @@ class TMDbService:
             else:
                 movie['poster_url'] = None
 
+        title_index.add_movies(results.get('results', []))
         return results
 
-    @cached
+    @cached(policy="trending")
     def get_trending_movies(self, time_window='week'):
         """Get trending movies for the day or week."""
         if time_window not in ['day', 'week']:
@@ -112,19 +228,31 @@ class TMDbService:
             else:
                 movie['poster_url'] = None
 
+        title_index.add_movies(results.get('results', []))
         return results
 
-    @cached
+    @cached(policy="autocomplete")
     def auto_complete(self, query):
-        """Get movie suggestions for auto-complete."""
+        """
+        Get movie suggestions for auto-complete.
+
+        Suggestions come from the local title index when it already holds a
+        full page of matches, or when an earlier complete search for a
+        shorter prefix means every match is indexed. Otherwise TMDb search
+        is used.
+        """
         if not query or len(query) < 2:
             return {'results': []}
 
+        suggestions = title_index.suggest(query, AUTOCOMPLETE_LIMIT)
+        if len(suggestions) >= AUTOCOMPLETE_LIMIT or title_index.covers(query):
+            return {'results': suggestions}
+
         results = self.search_movies(query)
 
         # Limit results and simplify data for autocomplete
         simple_results = []
-        for movie in results.get('results', [])[:10]:  # Limit to 10 results for autocomplete
+        for movie in results.get('results', [])[:AUTOCOMPLETE_LIMIT]:
             simple_results.append({
                 'id': movie.get('id'),
                 'title': movie.get('title'),
@@ -135,39 +263,27 @@ class TMDbService:
         return {'results': simple_results}
 
     @cached
-    def get_movie_watch_providers(self, movie_id):
-        """Get watch provider information for a movie."""
+    def get_movie_watch_providers(self, movie_id, region=None):
+        """Get watch provider information for a movie, for one region or all of them."""
         endpoint = f"movie/{movie_id}/watch/providers"
-        # The API returns results for all regions by default.
-        # We are primarily interested in US providers, which the frontend will filter.
-        return self._make_request(endpoint)
+        # The API returns results for all regions; only the requested one is kept and cached
+        return filter_watch_providers(self._make_request(endpoint), region)
 
     @cached
-    def search_person_movies(self, query, page=1):
-        """Search for movies by a person (actor/director)."""
-        # Step 1: Search for the person
-        person_search_endpoint = "search/person"
-        person_params = {
-            'query': query,
-            'page': page # Use page for person search as well, though we primarily want the first result
-        }
-        person_search_results = self._make_request(person_search_endpoint, person_params)
-
-        if not person_search_results or not person_search_results.get('results'):
-            return {'results': [], 'page': 1, 'total_pages': 0, 'total_results': 0} # TMDb like structure
-
+    def _resolve_person(self, query):
+        """Resolve a name to the best-matching TMDb person, or None."""
+        results = self._make_request("search/person", {'query': query})
+        people = results.get('results', [])
         # Assuming the first result is the correct person
-        person = person_search_results['results'][0]
-        person_id = person['id']
+        return {'id': people[0]['id'], 'name': people[0].get('name')} if people else None
 
-        # Step 2: Get movie credits for that person
-        movie_credits_endpoint = f"person/{person_id}/movie_credits"
-        # The movie_credits endpoint for a person doesn't support pagination directly in the API call for combined credits.
-        # It returns all cast and crew roles. We will return this as a single "page".
-        movie_credits = self._make_request(movie_credits_endpoint)
+    @cached(policy="details")
+    def _person_filmography(self, person_id):
+        """Get a person's movies from their cast and crew credits, most popular first."""
+        movie_credits = self._make_request(f"person/{person_id}/movie_credits")
 
         # Combine cast and crew, and ensure unique movies (a person can be cast and crew in the same movie)
-        all_roles = movie_credits.get('cast', []) + movie_credits.get('crew', []) 
+        all_roles = movie_credits.get('cast', []) + movie_credits.get('crew', [])
         movies_map = {}
         for role in all_roles:
             # We need a consistent movie structure, similar to search_movies results
@@ -185,16 +301,29 @@ class TMDbService:
                     'job': role.get('job', None), # For crew
                     'character': role.get('character', None) # For cast
                 }
-        
-        # Sort by popularity (descending) as a default sort order for person's movies
-        # The API returns cast and crew roles; they don't have a top-level 'popularity' like movies in a general search.
-        # We'll sort by the movie's own popularity field.
-        sorted_movies = sorted(list(movies_map.values()), key=lambda x: x.get('popularity', 0), reverse=True)
+
+        # Sort by the movie's own popularity field (descending) as a default sort order
+        return sorted(movies_map.values(), key=lambda x: x.get('popularity') or 0, reverse=True)
+
+    def search_person_movies(self, query, page=1):
+        """
+        Search for movies by a person (actor/director).
+
+        The name is resolved to a person once and their whole filmography is
+        fetched once; both are cached, so every page after the first is a
+        slice of the cached list without any upstream call.
+        """
+        person = self._resolve_person(query)
+        if person is None:
+            return {'results': [], 'page': 1, 'total_pages': 0, 'total_results': 0} # TMDb like structure
+
+        movies = self._person_filmography(person['id'])
+        start = (page - 1) * PERSON_MOVIES_PAGE_SIZE
 
         # Mimic the structure of search_movies response for consistency
         return {
-            'results': sorted_movies,
-            'page': 1, # Person credits are not paginated in the same way
-            'total_pages': 1,
-            'total_results': len(sorted_movies)
+            'results': movies[start:start + PERSON_MOVIES_PAGE_SIZE] if page >= 1 else [],
+            'page': page,
+            'total_pages': (len(movies) + PERSON_MOVIES_PAGE_SIZE - 1) // PERSON_MOVIES_PAGE_SIZE,
+            'total_results': len(movies)
         }
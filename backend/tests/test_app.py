@@ -1,7 +1,11 @@
 """Tests for the Flask application."""
 import pytest
+import gzip
 import json
+import app as app_module
 from app import app as flask_app
+from utils.catalog import MovieCatalog
+from utils.title_index import TitleIndex
 
 @pytest.fixture
 def app():
@@ -32,6 +36,13 @@ def test_search_no_query(client):
     data = json.loads(response.data)
     assert "error" in data
 
+def test_search_rejects_non_positive_paging(client):
+    """Test that page, pages and limit below 1 are rejected before calling TMDb."""
+    for params in ("page=0", "pages=-1", "limit=-5", "limit=0"):
+        response = client.get(f"/api/search?query=alien&{params}")
+        assert response.status_code == 400
+        assert "must be a positive integer" in response.get_json()["error"]
+
 def test_autocomplete_short_query(client):
     """Test autocomplete endpoint with short query."""
     response = client.get("/api/autocomplete?query=a")
@@ -39,6 +50,105 @@ def test_autocomplete_short_query(client):
     data = json.loads(response.data)
     assert data["results"] == []
 
+def test_movies_batch_requires_ids(client):
+    """Test batch movie endpoint with a missing or invalid id list."""
+    response = client.post("/api/movies/batch", json={})
+    assert response.status_code == 400
+    response = client.post("/api/movies/batch", json={"ids": ["abc"]})
+    assert response.status_code == 400
+
+def test_unknown_recommendation_session(client):
+    """Test session endpoints with a token that doesn't exist."""
+    response = client.get("/api/recommendations/sessions/missing")
+    assert response.status_code == 404
+    response = client.post("/api/recommendations/sessions/missing/seeds", json={"movie_ids": [1]})
+    assert response.status_code == 404
+
+def test_failed_recommendation_session_is_not_stored(client, monkeypatch):
+    """Test that a session whose seeds fail to load is never created."""
+    async def failing_fetch(session, movie_ids):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr("app.fetch_seeds", failing_fetch)
+    sessions = len(app_module.session_store)
+
+    response = client.post("/api/recommendations/sessions", json={"movie_ids": [1]})
+    assert response.status_code == 500
+    assert len(app_module.session_store) == sessions
+
+def test_watch_providers_default_region(client, monkeypatch):
+    """Test that watch providers default to DEFAULT_WATCH_REGION and region=all opts out."""
+    regions = []
+
+    class FakeTMDbService:
+        def get_movie_watch_providers(self, movie_id, region=None):
+            regions.append(region)
+            return {"id": movie_id, "results": {}}
+
+    monkeypatch.setattr("app.tmdb_service", FakeTMDbService())
+    monkeypatch.setattr("app.DEFAULT_WATCH_REGION", "GB")
+
+    for query in ("", "?region=de", "?region=all"):
+        assert client.get(f"/api/movie/1/watch_providers{query}").status_code == 200
+    assert regions == ["GB", "DE", None]
+
+def test_movie_details_gzip_and_etag(client, monkeypatch):
+    """Test that cached movie details are served gzipped with an ETag and a 304 on revalidation."""
+    movie = {"id": 1, "title": "Movie", "overview": "x" * 4000}
+
+    class FakeTMDbService:
+        def get_movie_details(self, movie_id):
+            return movie
+
+    monkeypatch.setattr("app.tmdb_service", FakeTMDbService())
+
+    response = client.get("/api/movie/1", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.data)) == movie
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/movie/1", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.get("/api/movie/1")
+    assert "Content-Encoding" not in response.headers
+    assert json.loads(response.data) == movie
+
+def test_metrics_endpoint(client):
+    """Test that route latencies are exposed in Prometheus text format."""
+    client.get("/api/health")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.data.decode()
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_count{route="/api/health",method="GET",status="200"}' in text
+
+def test_cache_clear_local_state(client, monkeypatch):
+    """Test that local=true also empties the autocomplete index and the in-process catalog."""
+    index, catalog = TitleIndex(), MovieCatalog()
+    index.add_movies([{"id": 1, "title": "Alien"}])
+    catalog.add_details({"id": 1, "genres": []})
+    monkeypatch.setattr("app.title_index", index)
+    monkeypatch.setattr("app.movie_catalog", catalog)
+
+    client.post("/api/admin/cache/clear")
+    assert index.stats()["movies"] == 1 and len(catalog) == 1
+
+    response = client.post("/api/admin/cache/clear?local=true")
+    assert response.get_json()["autocomplete_index"]["movies"] == 0
+    assert len(catalog) == 0 and catalog.get(1) is None
+
+def test_profiler_toggle(client):
+    """Test starting, reading and stopping the sampling profiler."""
+    response = client.post("/api/admin/profiler/start", json={"interval": 0.001})
+    assert json.loads(response.data)["profiler"]["running"]
+    response = client.post("/api/admin/profiler/stop")
+    assert not json.loads(response.data)["profiler"]["running"]
+    assert client.get("/api/admin/profiler").status_code == 200
+
 # Note: The following tests would require mocking the TMDb service
 # or having a valid API key in the test environment
 
@@ -0,0 +1,102 @@
+"""Tests for the async TMDb client, with the upstream request stubbed out."""
+import pytest
+from cache import clear_cache
+from services.async_tmdb_service import AsyncTMDbService, submit
+from services.tmdb_service import TMDbError
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty cache."""
+    clear_cache()
+    yield
+    clear_cache()
+
+@pytest.fixture
+def service(monkeypatch):
+    """An AsyncTMDbService whose upstream requests are recorded and faked."""
+    service = AsyncTMDbService()
+    service.requests = []
+
+    async def fake_request(endpoint, params=None):
+        service.requests.append(endpoint)
+        movie_id = int(endpoint.split('/')[1])
+        if movie_id == 404:
+            raise TMDbError('Error 404: not found', 404)
+        return {'id': movie_id, 'title': f'Movie {movie_id}', 'poster_path': '/p.jpg',
+                'credits': {'cast': []}, 'videos': {'results': []}}
+
+    monkeypatch.setattr(service, '_make_request', fake_request)
+    return service
+
+def test_batch_dedupes_and_reports_errors_per_id(service):
+    """Test that duplicate ids are fetched once and a failing id doesn't fail the batch."""
+    batch = submit(service.get_movie_details_batch([1, 2, 1, 404])).result(timeout=5)
+
+    assert [movie['id'] for movie in batch['results']] == [1, 2]
+    assert list(batch['errors']) == ['404']
+    assert sorted(service.requests) == ['movie/1', 'movie/2', 'movie/404']
+
+def test_batch_serves_cached_details_and_slims_payloads(service):
+    """Test that cached details are reused and slim payloads drop credits and videos."""
+    submit(service.get_movie_details(1)).result(timeout=5)
+    batch = submit(service.get_movie_details_batch([1], slim=True)).result(timeout=5)
+
+    assert service.requests == ['movie/1']
+    movie = batch['results'][0]
+    assert movie['poster_url'].endswith('/p.jpg')
+    assert 'credits' not in movie and 'videos' not in movie
+
+def test_watch_providers_batch_trims_to_region(monkeypatch):
+    """Test that batched providers are cached per region and compacted per movie."""
+    service = AsyncTMDbService()
+    requests = []
+
+    async def fake_request(endpoint, params=None):
+        requests.append(endpoint)
+        movie_id = int(endpoint.split('/')[1])
+        if movie_id == 404:
+            raise TMDbError('Error 404: not found', 404)
+        netflix = {'provider_id': 8, 'provider_name': 'Netflix', 'logo_path': '/n.jpg', 'display_priority': 1}
+        results = {'GB': {'link': 'gb', 'flatrate': [netflix]}}
+        if movie_id == 1:
+            results['US'] = {'link': 'us', 'flatrate': [netflix]}
+        return {'id': movie_id, 'results': results}
+
+    monkeypatch.setattr(service, '_make_request', fake_request)
+
+    batch = submit(service.get_watch_providers_batch([1, 2, 1, 404], 'US')).result(timeout=5)
+    assert batch['results'] == {
+        '1': {'link': 'us', 'flatrate': [{'provider_id': 8, 'provider_name': 'Netflix', 'logo_path': '/n.jpg'}]},
+        '2': None
+    }
+    assert list(batch['errors']) == ['404']
+
+    single = submit(service.get_movie_watch_providers(1, 'US')).result(timeout=5)
+    assert list(single['results']) == ['US']
+    assert len(requests) == 3
+
+def test_search_pages_are_merged_and_deduped(monkeypatch):
+    """Test that a page range is fetched through the cache, clamped to total_pages and deduped by id."""
+    service = AsyncTMDbService()
+    fetched = []
+
+    async def fake_request(endpoint, params=None):
+        page = params['page']
+        fetched.append(page)
+        # Page 3 repeats the last movie of page 2, as TMDb does when rankings shift
+        first_id = (page - 1) * 20 + (0 if page < 3 else -1)
+        return {'page': page, 'total_pages': 3, 'total_results': 60,
+                'results': [{'id': first_id + i, 'poster_path': None} for i in range(20)]}
+
+    monkeypatch.setattr(service, '_make_request', fake_request)
+    merged = submit(service.search_movies_pages('star', page=2, pages=5)).result(timeout=5)
+
+    assert merged['page'] == 2
+    assert merged['last_page'] == 3
+    assert [movie['id'] for movie in merged['results']] == list(range(20, 59))
+    assert sorted(fetched) == [2, 3]
+
+    limited = submit(service.search_movies_pages('star', limit=25)).result(timeout=5)
+    assert [movie['id'] for movie in limited['results']] == list(range(25))
+    # Page 2 is served from the cache filled by the first search
+    assert sorted(fetched) == [1, 2, 3]
@@ -0,0 +1,275 @@
+"""Tests for the caching layer."""
+import json
+import os
+import threading
+import time
+import pytest
+import cache
+from cache import cached, caches, clear_cache, encoded_response, get_cache_stats
+from cache.disk import DiskCache
+from cache.store import SizedTTLCache
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty cache."""
+    clear_cache()
+    yield
+    clear_cache()
+
+def test_cached_returns_stored_result():
+    """Test that a second call is served from the cache."""
+    calls = []
+
+    @cached
+    def lookup(value):
+        calls.append(value)
+        return {'value': value}
+
+    assert lookup(1) == {'value': 1}
+    assert lookup(1) == {'value': 1}
+    assert calls == [1]
+
+def test_concurrent_misses_share_one_call():
+    """Test that concurrent misses on the same key are coalesced."""
+    calls = []
+    release = threading.Event()
+
+    @cached
+    def slow_lookup(value):
+        calls.append(value)
+        release.wait(timeout=5)
+        return value * 2
+
+    before = get_cache_stats()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(slow_lookup(21))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+
+    # Give every thread a chance to miss before the leader finishes
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    stats = get_cache_stats()
+    assert calls == [21]
+    assert results == [42] * 8
+    assert stats['misses'] - before['misses'] == 1
+    assert stats['coalesced'] - before['coalesced'] == 7
+
+def test_coalesced_callers_receive_leader_error():
+    """Test that an error in the leading call is raised to every waiter and not cached."""
+    calls = []
+
+    @cached
+    def failing_lookup(value):
+        calls.append(value)
+        raise ValueError('upstream failed')
+
+    with pytest.raises(ValueError):
+        failing_lookup(1)
+    with pytest.raises(ValueError):
+        failing_lookup(1)
+    assert calls == [1, 1]
+
+def test_keys_ignore_self_and_normalize_arguments():
+    """Test that instances share entries and equivalent arguments share keys."""
+    calls = []
+
+    class Service:
+        @cached
+        def lookup(self, movie_ids, limit=10):
+            calls.append((tuple(movie_ids), limit))
+            return list(movie_ids)[:limit]
+
+    Service().lookup([1, 2, 3])
+    Service().lookup((1, 2, 3), limit=10)
+    assert calls == [((1, 2, 3), 10)]
+
+def test_policy_selects_cache():
+    """Test that a policy stores results in its own cache."""
+    @cached(policy="trending")
+    def trending():
+        return ['movie']
+
+    trending()
+    assert len(caches["trending"]) == 1
+    assert len(caches["default"]) == 0
+    assert get_cache_stats()["policies"]["trending"]["size"] == 1
+    assert get_cache_stats()["policies"]["trending"]["bytes"] > 0
+
+def test_stale_entry_is_served_while_refreshing():
+    """Test that an expired entry within its grace window is served and refreshed."""
+    calls = []
+    refreshed = threading.Event()
+
+    @cached(policy="trending")
+    def trending():
+        calls.append(len(calls))
+        if len(calls) > 1:
+            refreshed.set()
+        return len(calls)
+
+    assert trending() == 1
+    for entry in caches["trending"].values():
+        entry.fresh_until = 0
+
+    assert trending() == 1
+    assert refreshed.wait(timeout=5)
+    for _ in range(50):
+        if trending() == 2:
+            break
+        time.sleep(0.01)
+    assert trending() == 2
+    assert get_cache_stats()["refreshes"] >= 1
+
+def test_disk_cache_respects_ttl_and_size(tmp_path):
+    """Test that the disk tier expires entries and evicts above max_entries."""
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=60, max_entries=2)
+
+    disk.set('a', {'id': 1})
+    disk.set('b', {'id': 2}, ttl=-1)
+    assert disk.get('a') == (True, {'id': 1})
+    assert disk.get('b') == (False, None)
+
+    disk.set('c', {'id': 3})
+    disk.set('d', {'id': 4})
+    disk.evict()
+    assert disk.stats()['size'] == 2
+    assert disk.get('d') == (True, {'id': 4})
+
+def test_disk_cache_reconnects_after_fork(tmp_path, monkeypatch):
+    """Test that a forked worker opens its own connection instead of reusing the parent's."""
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), ttl=60, max_entries=10)
+    disk.set('a', {'id': 1})
+    parent_conn = disk._connect()
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+    assert disk.get('a') == (True, {'id': 1})
+    assert disk._connect() is not parent_conn
+
+def test_encoded_bodies_live_on_the_cache_entry():
+    """Test that a cached value is encoded once, counted in its entry's size and dropped with it."""
+    @cached
+    def movies():
+        return [{"id": 1, "title": "Movie " + "x" * 2000}]
+
+    value = movies()
+    bytes_before = get_cache_stats()["bytes"]
+    first = encoded_response(value, "results")
+    assert encoded_response(value, "results") is first
+    assert json.loads(first.body) == {"results": value}
+    assert get_cache_stats()["bytes"] == bytes_before + len(first.body) + len(first.gzip_body)
+    assert get_cache_stats()["encoded_hits"] == 1
+
+    # Values that aren't cached are encoded on every call
+    assert encoded_response(list(value), "results") is not first
+
+    clear_cache()
+    assert encoded_response(value, "results") is not first
+
+def test_sized_cache_evicts_large_cold_entries_first():
+    """Test that the byte budget is enforced by evicting the largest of the oldest entries."""
+    store = SizedTTLCache(maxsize=100, ttl=60, getsizeof=len, eviction_sample=2)
+    store['big'] = 'x' * 60
+    store['small'] = 'x' * 10
+    store['new'] = 'x' * 40
+
+    assert 'big' not in store
+    assert 'small' in store and 'new' in store
+    assert store.currsize == 50
+    assert store.evictions == 1
+
+def test_stats_report_bytes_per_function():
+    """Test that cache statistics attribute stored bytes to each cached function."""
+    @cached
+    def lookup(value):
+        return {'value': value}
+
+    lookup(1)
+    lookup(2)
+    usage = get_cache_stats()["functions"]["lookup"]
+    assert usage["entries"] == 2
+    assert usage["bytes"] > 2 * len(json.dumps({'value': 1}))
+
+def test_last_known_good_value_is_served_on_error():
+    """Test that an entry past its stale window is only served when reloading it fails."""
+    calls = []
+
+    @cached(policy="trending")
+    def trending():
+        calls.append(len(calls))
+        if len(calls) == 2:
+            raise RuntimeError("upstream down")
+        return len(calls)
+
+    assert trending() == 1
+    for entry in caches["trending"].values():
+        entry.fresh_until = entry.stale_until = 0
+
+    assert trending() == 1
+    assert get_cache_stats()["stale_if_error"] == 1
+    assert trending() == 3
+    assert len(calls) == 3
+
+def test_errors_with_negative_ttl_are_cached():
+    """Test that errors carrying a negative_ttl are re-raised from the cache until it expires."""
+    class NotFound(Exception):
+        negative_ttl = 60
+
+    calls = []
+
+    @cached
+    def details(movie_id):
+        calls.append(movie_id)
+        raise NotFound(f"movie {movie_id} not found")
+
+    for _ in range(3):
+        with pytest.raises(NotFound, match="movie 5 not found"):
+            details(5)
+    assert calls == [5]
+    assert get_cache_stats()["negative_hits"] == 2
+
+    for entry in caches["default"].values():
+        entry.fresh_until = 0
+    with pytest.raises(NotFound):
+        details(5)
+    assert calls == [5, 5]
+
+def test_values_that_are_not_json_serializable_are_cached():
+    """Test that sizing falls back for values json can't encode, without wedging the key."""
+    calls = []
+
+    @cached
+    def pairs(value):
+        calls.append(value)
+        return {(1, 2): 'v'}
+
+    assert pairs(1) == {(1, 2): 'v'}
+    assert pairs(1) == {(1, 2): 'v'}
+    assert calls == [1]
+    assert get_cache_stats()["in_flight"] == 0
+
+def test_results_are_sized_outside_the_cache_lock(monkeypatch):
+    """Test that serializing a result to size it doesn't hold the lock other lookups need."""
+    lock_free = []
+    estimate_size = cache._estimate_size
+
+    def checking_estimate(value):
+        # The lock is reentrant, so probe it from another thread
+        probe = threading.Thread(target=lambda: lock_free.append(
+            cache._lock.acquire(blocking=False) and (cache._lock.release() or True)))
+        probe.start()
+        probe.join()
+        return estimate_size(value)
+
+    monkeypatch.setattr(cache, '_estimate_size', checking_estimate)
+
+    @cached
+    def details(value):
+        return {'value': value}
+
+    details(1)
+    assert lock_free == [True]
@@ -0,0 +1,82 @@
+"""Tests for the local movie catalog."""
+import os
+from utils.catalog import MovieCatalog
+
+DETAILS = {
+    'id': 27205,
+    'title': 'Inception',
+    'genres': [{'id': 28}, {'id': 878}],
+    'keywords': {'keywords': [{'id': k} for k in range(1, 40)]},
+    'vote_average': 8.4,
+    'popularity': 95.5,
+    'release_date': '2010-07-15',
+    'poster_path': '/inception.jpg',
+    'credits': {'cast': [{'name': 'Leonardo DiCaprio'}]}
+}
+
+def test_round_trips_features():
+    """Test that only the recommendation features are kept."""
+    catalog = MovieCatalog(initial_capacity=1)
+    catalog.add_details(DETAILS)
+    record = catalog.get(27205)
+
+    assert record.title == 'Inception'
+    assert record.genre_ids == [28, 878]
+    # 39 keywords don't fit in a record, so its features must not be used for scoring
+    assert not record.complete
+    assert record.year == 2010
+    assert record.poster_path == '/inception.jpg'
+    assert catalog.get(1) is None
+
+def test_records_that_fit_are_complete():
+    """Test that a movie with few enough keywords keeps all of them."""
+    catalog = MovieCatalog(initial_capacity=1)
+    catalog.add_details({**DETAILS, 'keywords': {'keywords': [{'id': k} for k in range(1, 33)]}})
+    record = catalog.get(27205)
+
+    assert record.complete
+    assert record.keyword_ids == list(range(1, 33))
+
+def test_file_is_shared_between_instances(tmp_path):
+    """Test that a second mapping of the same file sees records added later."""
+    path = str(tmp_path / 'catalog.bin')
+    writer = MovieCatalog(path, initial_capacity=1)
+    reader = MovieCatalog(path)
+
+    writer.add_details(DETAILS)
+    writer.add_details({**DETAILS, 'id': 2, 'title': 'Second'})
+    writer.add_details({**DETAILS, 'vote_average': 9.0})
+
+    assert reader.get(2).title == 'Second'
+    assert round(reader.get(27205).vote_average, 1) == 9.0
+    assert len(reader) == 2
+
+def test_file_is_reopened_after_fork(tmp_path, monkeypatch):
+    """Test that a forked worker maps the file itself instead of sharing the parent's flock."""
+    catalog = MovieCatalog(str(tmp_path / 'catalog.bin'))
+    catalog.add_details(DETAILS)
+    parent_fd = catalog._fd
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+    catalog.add_details({**DETAILS, 'id': 2})
+    assert catalog._fd != parent_fd
+    assert len(catalog) == 2
+
+def test_forked_writers_keep_every_record(tmp_path):
+    """Test that workers forked after the catalog was opened don't overwrite each other's appends."""
+    catalog = MovieCatalog(str(tmp_path / 'catalog.bin'), initial_capacity=1)
+    catalog.add_details(DETAILS)
+
+    children = []
+    for worker in range(4):
+        child = os.fork()
+        if child == 0:
+            for movie_id in range(1000 * (worker + 1), 1000 * (worker + 1) + 300):
+                catalog.add_details({**DETAILS, 'id': movie_id})
+            os._exit(0)
+        children.append(child)
+    for child in children:
+        assert os.waitpid(child, 0)[1] == 0
+
+    assert len(catalog) == 1201
@@ -0,0 +1,41 @@
+"""Tests for the upstream circuit breaker."""
+import time
+from services.circuit_breaker import CircuitBreaker
+
+def test_opens_after_consecutive_failures():
+    """Test that the circuit opens at the threshold and then rejects requests."""
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    breaker.record_success()
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    stats = breaker.stats()
+    assert stats["opened"] == 1
+    assert stats["rejected"] == 1
+    assert 0 < stats["retry_in"] <= 60
+
+def test_half_open_trial_closes_or_reopens():
+    """Test that one trial request is let through after the reset timeout."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
@@ -0,0 +1,23 @@
+"""Tests for the benchmark fake TMDb server."""
+import requests
+from benchmarks.fake_tmdb import start_server
+
+def test_serves_catalog_and_rate_limits():
+    """Test that the fake serves TMDb-shaped payloads, counts calls and returns 429s over its limit."""
+    server, fake, base_url = start_server(movies=50, people=5, latency_ms=0, jitter_ms=0, rate_limit=3)
+    try:
+        movie = requests.get(f"{base_url}/movie/7", params={'append_to_response': 'credits,keywords'}).json()
+        assert movie['id'] == 7
+        assert movie['keywords']['keywords']
+        assert 'cast' in movie['credits']
+
+        assert requests.get(f"{base_url}/movie/999").status_code == 404
+        assert requests.get(f"{base_url}/trending/movie/week").json()['results']
+
+        response = requests.get(f"{base_url}/trending/movie/day")
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+        assert fake.stats()['endpoints'] == {'movie/{id}': 2, 'trending/movie/week': 1, 'trending/movie/day': 1}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,54 @@
+"""Tests for the pooled upstream HTTP client."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import pytest
+from services.http_client import HTTPClient
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answer 429 with Retry-After for the first request, then 200."""
+
+    protocol_version = "HTTP/1.1"
+    requests_seen = 0
+
+    def do_GET(self):
+        FlakyHandler.requests_seen += 1
+        if FlakyHandler.requests_seen == 1:
+            status, body = 429, b'{"status_message": "slow down"}'
+        else:
+            status, body = 200, b'{"ok": true}'
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server_url():
+    """Run the flaky server on a free local port."""
+    FlakyHandler.requests_seen = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+def test_retries_rate_limited_response_and_reuses_connection(server_url):
+    """Test that a 429 is retried and that keep-alive connections are reused."""
+    client = HTTPClient(max_retries=2, backoff_base=0.01)
+    attempts = []
+
+    response = client.get(f"{server_url}/movie/1", before_attempt=lambda: attempts.append(1))
+    assert response.status_code == 200
+    assert len(attempts) == 2
+
+    client.get(f"{server_url}/movie/2")
+    stats = client.stats()
+    assert stats["retries"] == 1
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 1
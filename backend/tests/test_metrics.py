@@ -0,0 +1,27 @@
+"""Tests for the metrics registry."""
+from utils.metrics import Counter, Histogram, endpoint_label
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that observations land in cumulative le buckets with a sum and count."""
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.1, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+    assert histogram.count("/a") == 3
+
+def test_counter_escapes_labels():
+    """Test that label values are escaped."""
+    counter = Counter("calls_total", "Calls.", ("name",))
+    counter.inc('say "hi"', amount=2)
+    assert r'calls_total{name="say \"hi\""} 2' in counter.render()
+
+def test_endpoint_label_collapses_ids():
+    """Test that numeric path segments are collapsed."""
+    assert endpoint_label("movie/27205/recommendations") == "movie/{id}/recommendations"
+    assert endpoint_label("trending/movie/week") == "trending/movie/week"
@@ -0,0 +1,26 @@
+"""Tests for the precomputed neighbor index."""
+from utils.catalog import CatalogRecord, MovieCatalog
+from utils.neighbor_index import NeighborIndex, build_index
+
+def _record(movie_id, genre_ids, keyword_ids, vote_average=5.0):
+    return CatalogRecord(movie_id, f"Movie {movie_id}", genre_ids, keyword_ids,
+                         vote_average, 10.0, 2000, '')
+
+def test_build_write_and_load(tmp_path):
+    """Test that neighbors rank by shared features and survive a write/load round trip."""
+    catalog_path = str(tmp_path / "catalog.bin")
+    catalog = MovieCatalog(catalog_path)
+    catalog.add(_record(1, [28], [10, 11]))
+    catalog.add(_record(2, [28], [10, 11]))
+    catalog.add(_record(3, [28], [], vote_average=9.0))
+    catalog.add(_record(4, [35], [99]))
+
+    index = build_index(catalog_path, top_n=3, workers=1)
+    index_path = str(tmp_path / "neighbors.bin")
+    index.write(index_path)
+    loaded = NeighborIndex.load(index_path)
+
+    assert len(loaded) == 4
+    assert loaded.neighbors(1) == [2, 3]
+    assert loaded.neighbors(4) == []
+    assert loaded.neighbors(5) is None
@@ -0,0 +1,65 @@
+"""Tests for the token-bucket rate limiter."""
+import os
+import threading
+from services.rate_limiter import TokenBucket
+
+def test_allows_burst_then_waits():
+    """Test that a full bucket serves a burst without waiting."""
+    bucket = TokenBucket(capacity=4, period=1)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0] * 4
+    assert bucket.reserve() > 0
+    assert bucket.stats()["waited"] == 1
+
+def test_concurrent_reservations_are_spaced():
+    """Test that threads reserving at once get distinct, increasing waits."""
+    bucket = TokenBucket(capacity=2, period=1)
+    delays = []
+    lock = threading.Lock()
+
+    def reserve():
+        delay = bucket.reserve()
+        with lock:
+            delays.append(delay)
+
+    threads = [threading.Thread(target=reserve) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    delays.sort()
+    assert delays[:2] == [0.0, 0.0]
+    # Four requests over budget at 2 per second need roughly 0.5s, 1s, 1.5s, 2s
+    assert 1.9 < delays[-1] < 2.1
+
+def test_shared_state_file_spans_instances(tmp_path):
+    """Test that limiters backed by the same file draw from one budget."""
+    path = str(tmp_path / 'tmdb.bucket')
+    first = TokenBucket(capacity=2, period=10, state_path=path)
+    second = TokenBucket(capacity=2, period=10, state_path=path)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == 0.0
+    assert first.reserve() > 0
+
+def test_shared_available_reads_the_file(tmp_path):
+    """Test that available() reflects tokens taken by another worker."""
+    path = str(tmp_path / 'tmdb.bucket')
+    first = TokenBucket(capacity=2, period=10, state_path=path)
+    second = TokenBucket(capacity=2, period=10, state_path=path)
+
+    second.reserve()
+    second.reserve()
+    assert first.available() < 1
+
+def test_shared_file_is_reopened_after_fork(tmp_path, monkeypatch):
+    """Test that a forked worker opens its own descriptor instead of sharing the parent's flock."""
+    bucket = TokenBucket(capacity=2, period=10, state_path=str(tmp_path / 'tmdb.bucket'))
+    bucket.reserve()
+    parent_fd = bucket._fd
+
+    pid = os.getpid()
+    monkeypatch.setattr(os, 'getpid', lambda: pid + 1)
+    bucket.reserve()
+    assert bucket._fd != parent_fd
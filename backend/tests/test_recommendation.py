@@ -0,0 +1,195 @@
+"""Tests for the recommendation algorithms, using a stubbed TMDb service."""
+import asyncio
+import threading
+import pytest
+from cache import clear_cache
+from services.async_tmdb_service import submit
+from utils import recommendation
+from utils import neighbor_index
+from utils.catalog import MovieCatalog
+from utils.neighbor_index import NeighborIndex
+
+class FakeTMDbService:
+    """Stand-in for TMDbService serving a small fixed catalog."""
+
+    def __init__(self, slow_ids=()):
+        self.slow_ids = set(slow_ids)
+        self.release = threading.Event()
+        self.detail_calls = []
+
+    def get_movie_details(self, movie_id):
+        self.detail_calls.append(movie_id)
+        if movie_id in self.slow_ids:
+            self.release.wait(timeout=5)
+        keywords = {1: [10, 11], 2: [10, 11], 3: [99]}.get(movie_id, [])
+        return {
+            'id': movie_id,
+            'title': f'Movie {movie_id}',
+            'overview': f'About movie {movie_id}',
+            'genres': [{'id': 28}],
+            'keywords': {'keywords': [{'id': k} for k in keywords]}
+        }
+
+    def get_movie_recommendations(self, movie_id, page=1):
+        return {'results': [
+            {'id': 3, 'genre_ids': [28], 'vote_average': 9.0, 'popularity': 10},
+            {'id': 2, 'genre_ids': [28], 'vote_average': 5.0, 'popularity': 10},
+            {'id': 4, 'genre_ids': [35], 'vote_average': 8.0, 'popularity': 10},
+        ]}
+
+class FakeAsyncTMDbService:
+    """Async wrapper around FakeTMDbService."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def get_movie_details(self, movie_id):
+        return self.service.get_movie_details(movie_id)
+
+    async def get_movie_recommendations(self, movie_id, page=1):
+        return self.service.get_movie_recommendations(movie_id, page)
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Start every test with an empty cache and catalog."""
+    monkeypatch.setattr(recommendation, 'movie_catalog', MovieCatalog())
+    monkeypatch.setattr(neighbor_index, 'neighbor_index', None)
+    clear_cache()
+    yield
+    clear_cache()
+
+def test_keyword_overlap_ranks_candidates(monkeypatch):
+    """Test that candidates sharing keywords rank first and only genre matches are fetched."""
+    service = FakeTMDbService()
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+
+    results = recommendation.get_content_based_recommendations(1, limit=3)
+
+    assert [movie['id'] for movie in results] == [2, 3, 4]
+    assert 4 not in service.detail_calls
+
+def test_budget_scores_late_candidates_without_keywords(monkeypatch):
+    """Test that a spent budget skips slow candidates and the result is not cached."""
+    service = FakeTMDbService(slow_ids={2})
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+
+    try:
+        results = recommendation.get_content_based_recommendations(1, limit=3, budget_ms=50)
+    finally:
+        service.release.set()
+
+    # Without its keywords, movie 2 falls behind on vote average
+    assert [movie['id'] for movie in results] == [3, 2, 4]
+    calls = len(service.detail_calls)
+    recommendation.get_content_based_recommendations(1, limit=3)
+    assert len(service.detail_calls) > calls
+
+def test_async_recommendations_match_sync(monkeypatch):
+    """Test that the async path ranks like the sync path and shares its cache entry."""
+    service = FakeTMDbService()
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+    monkeypatch.setattr(recommendation, 'async_tmdb_service', FakeAsyncTMDbService(service))
+
+    results = submit(recommendation.get_content_based_recommendations_async(1, limit=3)).result(timeout=5)
+    assert [movie['id'] for movie in results] == [2, 3, 4]
+
+    calls = len(service.detail_calls)
+    assert recommendation.get_content_based_recommendations(1, limit=3) == results
+    assert len(service.detail_calls) == calls
+
+def test_async_hybrid_skips_failing_seed(monkeypatch):
+    """Test that a failing seed doesn't fail the hybrid recommendations."""
+    service = FakeTMDbService()
+    fake_async = FakeAsyncTMDbService(service)
+
+    async def get_movie_details(movie_id):
+        if movie_id == 99:
+            raise ValueError('not found')
+        return service.get_movie_details(movie_id)
+
+    fake_async.get_movie_details = get_movie_details
+    monkeypatch.setattr(recommendation, 'async_tmdb_service', fake_async)
+
+    results = submit(recommendation.get_hybrid_recommendations_async([99, 1], limit=2)).result(timeout=5)
+    assert [movie['id'] for movie in results] == [3, 2]
+
+def test_hybrid_deadline_returns_finished_seeds(monkeypatch):
+    """Test that a slow seed is flagged and left to finish in the background."""
+    service = FakeTMDbService(slow_ids={5})
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+
+    try:
+        results = recommendation.get_hybrid_recommendations([1, 5], limit=2, timeout_ms=100)
+        assert [movie['id'] for movie in results] == [3, 2]
+        assert results.incomplete_seeds == [5]
+    finally:
+        service.release.set()
+
+    results = recommendation.get_hybrid_recommendations([1, 5], limit=2, timeout_ms=1000)
+    assert not hasattr(results, 'incomplete_seeds')
+
+def test_async_hybrid_deadline_returns_finished_seeds(monkeypatch):
+    """Test that the async hybrid returns finished seeds when its deadline passes."""
+    service = FakeTMDbService()
+    fake_async = FakeAsyncTMDbService(service)
+    release = asyncio.Event()
+
+    async def get_movie_details(movie_id):
+        if movie_id == 5:
+            await release.wait()
+        return service.get_movie_details(movie_id)
+
+    fake_async.get_movie_details = get_movie_details
+    monkeypatch.setattr(recommendation, 'async_tmdb_service', fake_async)
+
+    results = submit(recommendation.get_hybrid_recommendations_async([1, 5], limit=2, timeout_ms=100)).result(timeout=5)
+    assert [movie['id'] for movie in results] == [3, 2]
+    assert results.incomplete_seeds == [5]
+
+    async def finish():
+        release.set()
+        await asyncio.gather(*recommendation._background_seeds)
+
+    submit(finish()).result(timeout=5)
+    assert not recommendation._background_seeds
+
+def test_catalog_features_avoid_detail_fetches(monkeypatch):
+    """Test that movies in the local catalog are scored without fetching their details."""
+    service = FakeTMDbService()
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+    for movie_id in (1, 2, 3):
+        recommendation.movie_catalog.add_details(service.get_movie_details(movie_id))
+    service.detail_calls.clear()
+
+    results = recommendation.get_content_based_recommendations(1, limit=3)
+
+    assert [movie['id'] for movie in results] == [2, 3, 4]
+    assert service.detail_calls == []
+
+def test_truncated_catalog_records_fall_back_to_details(monkeypatch):
+    """Test that a catalog record whose keywords didn't all fit isn't used for scoring."""
+    service = FakeTMDbService()
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+    recommendation.movie_catalog.add_details({
+        'id': 2, 'genres': [{'id': 28}], 'keywords': {'keywords': [{'id': k} for k in range(40)]}
+    })
+
+    recommendation.get_content_based_recommendations(1, limit=3)
+
+    assert 2 in service.detail_calls
+
+def test_neighbor_index_answers_without_upstream_calls(monkeypatch):
+    """Test that indexed movies skip scoring and come back shaped like live results."""
+    service = FakeTMDbService()
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+    monkeypatch.setattr(recommendation, 'async_tmdb_service', FakeAsyncTMDbService(service))
+    monkeypatch.setattr(neighbor_index, 'neighbor_index', NeighborIndex([1], [[3, 2, 0]]))
+
+    results = recommendation.get_content_based_recommendations(1, limit=1)
+    assert results == [{'id': 3, 'title': 'Movie 3', 'overview': 'About movie 3', 'genre_ids': [28]}]
+    assert service.detail_calls == [3]
+
+    clear_cache()
+    async_results = submit(recommendation.get_content_based_recommendations_async(1, limit=2)).result(timeout=5)
+    assert [movie['id'] for movie in async_results] == [3, 2]
+    assert async_results[0] == results[0]
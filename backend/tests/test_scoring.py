@@ -0,0 +1,49 @@
+"""Tests for vectorized recommendation scoring."""
+import random
+import numpy as np
+from utils.scoring import overlap_counts, score_content, top_k
+
+def test_overlap_counts():
+    """Test per-candidate overlap counts, including empty candidates."""
+    counts = overlap_counts({1, 2, 3}, [[1, 2], [], [4], [3, 5, 1]])
+    assert counts.tolist() == [2, 0, 0, 2]
+
+def test_top_k_orders_ties_by_position():
+    """Test that top_k matches a stable descending sort."""
+    scores = np.array([1.0, 3.0, 2.0, 3.0, 2.0, 0.5])
+    assert top_k(scores, 3).tolist() == [1, 3, 2]
+    assert top_k(scores, 10).tolist() == [1, 3, 2, 4, 0, 5]
+    assert top_k(scores, 0).tolist() == []
+
+def test_score_content_matches_loop():
+    """Test that vectorized scores match the per-movie formula on random candidates."""
+    rng = random.Random(7)
+    genre_ids = [1, 2, 3]
+    keyword_ids = [10, 11, 12, 13]
+    candidates = [{
+        'genre_ids': rng.sample(range(1, 8), rng.randint(0, 3)),
+        'keyword_ids': rng.sample(range(8, 20), rng.randint(0, 5)),
+        'vote_average': rng.choice([None, rng.uniform(0, 10)]),
+        'popularity': rng.uniform(0, 300)
+    } for _ in range(500)]
+
+    scores = score_content(
+        genre_ids, keyword_ids,
+        [c['genre_ids'] for c in candidates],
+        [c['keyword_ids'] for c in candidates],
+        [c['vote_average'] for c in candidates],
+        [c['popularity'] for c in candidates]
+    )
+
+    expected = []
+    for c in candidates:
+        score = len(set(genre_ids) & set(c['genre_ids'])) * 2
+        score += len(set(keyword_ids) & set(c['keyword_ids']))
+        if c['vote_average']:
+            score += c['vote_average'] / 10
+        score += min(c['popularity'] / 100, 1)
+        expected.append(score)
+
+    assert np.allclose(scores, expected)
+    ranked = sorted(range(len(expected)), key=lambda i: expected[i], reverse=True)
+    assert top_k(scores, 20).tolist() == ranked[:20]
@@ -0,0 +1,79 @@
+"""Tests for incremental recommendation sessions."""
+import time
+from services.async_tmdb_service import submit
+from utils import recommendation
+from utils.sessions import RecommendationSession, SessionStore, fetch_seeds
+
+def _movie(movie_id, vote_average):
+    return {'id': movie_id, 'vote_average': vote_average, 'popularity': 10}
+
+def test_session_ranks_like_hybrid_merge():
+    """Test that adding and removing seeds keeps the hybrid ranking."""
+    first = [_movie(1, 5.0), _movie(2, 9.0)]
+    second = [_movie(1, 5.0), _movie(3, 8.0)]
+    session = RecommendationSession(limit=3)
+
+    session.add_seed(10, first)
+    session.add_seed(20, second)
+    assert [movie['id'] for movie in session.top()] == \
+        [movie['id'] for movie in recommendation._merge_hybrid(first + second, 3)]
+
+    assert session.remove_seed(10)
+    assert not session.remove_seed(10)
+    assert [movie['id'] for movie in session.top()] == [3, 1]
+    assert session.seeds == [20]
+
+def test_store_evicts_least_recently_used_and_idle(monkeypatch):
+    """Test that the store is bounded and drops idle sessions."""
+    store = SessionStore(max_sessions=2, idle_ttl=60)
+    first = store.create(RecommendationSession())
+    second = store.create(RecommendationSession())
+    store.get(first)
+    third = store.create(RecommendationSession())
+
+    assert store.get(second) is None
+    assert store.get(first) is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    assert store.get(third) is None
+    assert len(store) == 0
+
+def test_store_file_is_shared_between_stores(tmp_path):
+    """Test that stores on the same file, as in separate workers, see each other's sessions."""
+    path = str(tmp_path / 'sessions.db')
+    worker_a, worker_b = SessionStore(path), SessionStore(path)
+    session = RecommendationSession(limit=2)
+    session.add_seed(10, [_movie(1, 5.0), _movie(2, 9.0)])
+    token = worker_a.create(session)
+
+    session, _ = worker_b.update(token, lambda session: session.add_seed(20, [_movie(3, 8.0)]))
+    assert session.seeds == [10, 20]
+
+    session = worker_a.get(token)
+    assert session.seeds == [10, 20]
+    assert [movie['id'] for movie in session.top()] == [2, 3]
+    assert worker_b.delete(token)
+    assert worker_a.get(token) is None
+
+def test_fetch_seeds_fetches_only_new_seeds(monkeypatch):
+    """Test that seeds already in a session are not fetched again and failures are reported."""
+    calls = []
+
+    async def fake_recommendations(movie_id, limit=10):
+        calls.append(movie_id)
+        if movie_id == 99:
+            raise ValueError('not found')
+        return [_movie(movie_id + 1, 7.0)]
+
+    monkeypatch.setattr(recommendation, 'get_content_based_recommendations_async', fake_recommendations)
+    session = RecommendationSession()
+
+    seeds, _ = submit(fetch_seeds(session, [1, 2])).result(timeout=5)
+    session.add_seeds(seeds)
+    seeds, errors = submit(fetch_seeds(session, [2, 99, 3])).result(timeout=5)
+    session.add_seeds(seeds)
+
+    assert calls == [1, 2, 99, 3]
+    assert errors == {'99': 'not found'}
+    assert session.seeds == [1, 2, 3]
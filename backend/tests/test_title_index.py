@@ -0,0 +1,39 @@
+"""Tests for the autocomplete title index."""
+import json
+from utils.title_index import TitleIndex
+
+MOVIES = [
+    {'id': 1, 'title': 'The Dark Knight', 'release_date': '2008-07-16', 'popularity': 80},
+    {'id': 2, 'title': 'Dark City', 'release_date': '1998-02-27', 'popularity': 20},
+    {'id': 3, 'title': 'Amélie', 'release_date': '2001-04-25', 'popularity': 30},
+    {'id': 4, 'title': 'Darkest Hour', 'release_date': '2017-11-22', 'popularity': 50},
+]
+
+def test_suggest_matches_word_starts_by_popularity():
+    """Test that any word of a title matches and results rank by popularity."""
+    index = TitleIndex()
+    index.add_movies(MOVIES)
+
+    assert [m['id'] for m in index.suggest('dark')] == [1, 4, 2]
+    assert [m['id'] for m in index.suggest('knig')] == [1]
+    assert index.suggest('amel') == [{'id': 3, 'title': 'Amélie', 'year': '2001', 'poster_url': None}]
+    assert index.suggest('dark', limit=1)[0]['id'] == 1
+
+def test_complete_query_covers_longer_queries():
+    """Test that a complete upstream search lets extensions be answered locally."""
+    index = TitleIndex()
+    index.mark_complete('Dark')
+
+    assert index.covers('dark ci')
+    assert not index.covers('da')
+    assert not index.covers('amelie')
+
+def test_load_file(tmp_path):
+    """Test bulk loading from a JSON-lines title dump."""
+    path = tmp_path / 'movie_ids.json'
+    path.write_text('\n'.join(json.dumps({'id': m['id'], 'original_title': m['title'],
+                                          'popularity': m['popularity']}) for m in MOVIES))
+    index = TitleIndex()
+
+    assert index.load_file(str(path)) == 4
+    assert [m['id'] for m in index.suggest('dark c')] == [2]
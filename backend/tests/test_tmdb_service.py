@@ -0,0 +1,83 @@
+"""Tests for the TMDb service, with the upstream request stubbed out."""
+import pytest
+import requests
+from cache import clear_cache
+from services.circuit_breaker import CircuitBreaker
+from services.tmdb_service import TMDbService, TMDbError, CircuitOpenError
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Start every test with an empty cache."""
+    clear_cache()
+    yield
+    clear_cache()
+
+@pytest.fixture
+def service(monkeypatch):
+    """A TMDbService answering person searches from a fake filmography of 45 movies."""
+    service = TMDbService()
+    service.requests = []
+
+    def fake_request(endpoint, params=None):
+        service.requests.append(endpoint)
+        if endpoint == 'search/person':
+            if params['query'] == 'nobody':
+                return {'results': []}
+            return {'results': [{'id': 7, 'name': 'Prolific Actor'}]}
+        cast = [{'id': i, 'title': f'Movie {i}', 'popularity': i, 'character': 'Self'} for i in range(1, 41)]
+        crew = [{'id': i, 'title': f'Movie {i}', 'popularity': i, 'job': 'Director'} for i in range(36, 46)]
+        return {'cast': cast, 'crew': crew}
+
+    monkeypatch.setattr(service, '_make_request', fake_request)
+    return service
+
+def test_person_movies_are_paged_from_cached_filmography(service):
+    """Test that pages are slices of one deduped filmography fetched once."""
+    first = service.search_person_movies('prolific actor')
+    assert [movie['id'] for movie in first['results']][:3] == [45, 44, 43]
+    assert len(first['results']) == 20
+    assert first['total_results'] == 45
+    assert first['total_pages'] == 3
+
+    last = service.search_person_movies('prolific actor', page=3)
+    assert [movie['id'] for movie in last['results']] == [5, 4, 3, 2, 1]
+    assert service.search_person_movies('prolific actor', page=4)['results'] == []
+    assert service.requests == ['search/person', 'person/7/movie_credits']
+
+def test_unknown_person_returns_empty_page(service):
+    """Test that a name without a match returns an empty result set."""
+    assert service.search_person_movies('nobody') == {'results': [], 'page': 1, 'total_pages': 0, 'total_results': 0}
+
+def test_open_circuit_fails_fast(monkeypatch):
+    """Test that requests fail without reaching TMDb while the circuit is open."""
+    service = TMDbService()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(service, 'circuit_breaker', breaker)
+    calls = []
+
+    def failing_get(url, params=None, before_attempt=None):
+        calls.append(url)
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(service.http, 'get', failing_get)
+
+    for movie_id in (1, 2):
+        with pytest.raises(TMDbError):
+            service.get_movie_details(movie_id)
+    with pytest.raises(CircuitOpenError):
+        service.get_movie_details(3)
+    assert len(calls) == 2
+    assert breaker.stats()['state'] == 'open'
+
+def test_not_found_is_negatively_cached(service, monkeypatch):
+    """Test that a 404 is cached briefly instead of asking TMDb again."""
+    def missing(endpoint, params=None):
+        service.requests.append(endpoint)
+        raise TMDbError("Error 404: not found", 404)
+
+    monkeypatch.setattr(service, '_make_request', missing)
+    for _ in range(2):
+        with pytest.raises(TMDbError) as error:
+            service.get_movie_details(999)
+        assert error.value.status_code == 404
+    assert service.requests == ['movie/999']
@@ -0,0 +1,70 @@
+"""Tests for cache warmup and predictive prefetching."""
+import threading
+from utils import recommendation, warmup
+
+class FakeTMDbService:
+    """Stand-in for TMDbService recording warmup calls."""
+
+    def __init__(self):
+        self.detail_calls = []
+
+    def get_trending_movies(self, time_window='week'):
+        if time_window == 'day':
+            return {'results': [{'id': 1}, {'id': 2}]}
+        return {'results': [{'id': 2}, {'id': 3}]}
+
+    def get_movie_details(self, movie_id):
+        self.detail_calls.append(movie_id)
+        if movie_id == 3:
+            raise ValueError('not found')
+        return {'id': movie_id}
+
+class FakeLimiter:
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def available(self):
+        return self.tokens
+
+def test_warm_cache_fetches_trending_details_and_recommendations(monkeypatch):
+    """Test that warmup visits each trending movie once and skips failures."""
+    service = FakeTMDbService()
+    recommended = []
+    monkeypatch.setattr(recommendation, 'tmdb_service', service)
+    monkeypatch.setattr(recommendation, 'get_content_based_recommendations', recommended.append)
+
+    assert warmup.warm_cache(max_movies=3) == 2
+    assert service.detail_calls == [1, 2, 3]
+    assert recommended == [1, 2]
+
+def test_prefetch_respects_rate_limit_budget(monkeypatch):
+    """Test that prefetches are only queued while the rate limiter has spare tokens."""
+    recommended = []
+    monkeypatch.setattr(recommendation, 'get_content_based_recommendations', recommended.append)
+
+    monkeypatch.setattr(warmup, 'rate_limiter', FakeLimiter(0))
+    assert not warmup.prefetch_recommendations(1)
+
+    monkeypatch.setattr(warmup, 'rate_limiter', FakeLimiter(1000))
+    assert warmup.prefetch_recommendations(2)
+    warmup._prefetch_executor.submit(lambda: None).result(timeout=5)
+    assert recommended == [2]
+
+def test_search_page_prefetch_fills_the_cache_once(monkeypatch):
+    """Test that a queued search page is fetched in the background and not queued twice."""
+    searched = []
+    release = threading.Event()
+
+    class SearchService:
+        def search_movies(self, query, page=1):
+            release.wait(timeout=5)
+            searched.append((query, page))
+
+    monkeypatch.setattr(recommendation, 'tmdb_service', SearchService())
+    monkeypatch.setattr(warmup, 'rate_limiter', FakeLimiter(1000))
+
+    assert warmup.prefetch_search_page('star', 2)
+    assert not warmup.prefetch_search_page('star', 2)
+    release.set()
+    warmup._prefetch_executor.submit(lambda: None).result(timeout=5)
+    assert searched == [('star', 2)]
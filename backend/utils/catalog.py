@@ -0,0 +1,248 @@
+"""Compact local catalog of the movie features recommendations need."""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from config import CATALOG_PATH
+
+# File header: magic, format version, number of records
+_HEADER = struct.Struct("<4sHxxI")
+_MAGIC = b"MCAT"
+_VERSION = 2
+
+MAX_GENRES = 8
+MAX_KEYWORDS = 32
+
+# Fixed-width record: id, vote average, popularity, release year, genre and
+# keyword counts, genre ids, keyword ids, poster path, title (UTF-8).
+# A count above its maximum means the list didn't fit; only the first ids are stored.
+_RECORD = struct.Struct(f"<iffHBB{MAX_GENRES}i{MAX_KEYWORDS}i40s80s")
+
+def _encode(text, size):
+    """Encode text to at most size bytes without splitting a UTF-8 character."""
+    return (text or '').encode('utf-8')[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+def _decode(raw):
+    """Decode a NUL-padded fixed-width string field."""
+    return raw.rstrip(b'\0').decode('utf-8')
+
+class CatalogRecord:
+    """
+    The recommendation features of one movie.
+
+    ``complete`` is False for a record read back from storage whose genre
+    or keyword ids didn't all fit in it. Its id lists are then truncated and
+    must not be used for scoring; callers fetch the movie's details instead.
+    """
+
+    __slots__ = ('id', 'title', 'genre_ids', 'keyword_ids', 'vote_average',
+                 'popularity', 'year', 'poster_path', 'complete')
+
+    def __init__(self, id, title, genre_ids, keyword_ids, vote_average, popularity, year, poster_path,
+                 complete=True):
+        self.id = id
+        self.title = title
+        self.genre_ids = genre_ids
+        self.keyword_ids = keyword_ids
+        self.vote_average = vote_average
+        self.popularity = popularity
+        self.year = year
+        self.poster_path = poster_path
+        self.complete = complete
+
+    @classmethod
+    def from_details(cls, movie):
+        """Build a record from a get_movie_details payload."""
+        release_date = movie.get('release_date') or ''
+        return cls(
+            id=movie['id'],
+            title=movie.get('title') or '',
+            genre_ids=[genre['id'] for genre in movie.get('genres', [])],
+            keyword_ids=[keyword['id'] for keyword in movie.get('keywords', {}).get('keywords', [])],
+            vote_average=movie.get('vote_average') or 0.0,
+            popularity=movie.get('popularity') or 0.0,
+            year=int(release_date[:4]) if release_date[:4].isdigit() else 0,
+            poster_path=movie.get('poster_path') or ''
+        )
+
+class MovieCatalog:
+    """
+    Array of fixed-width movie records, optionally in a shared memory-mapped file.
+
+    With a ``path``, records live in a file mapped into every worker process,
+    so they share one copy in the page cache. Appends take an exclusive
+    ``flock`` and bump the record count in the header last. Other processes
+    pick new records up on their next lookup miss. Without a path, records
+    are kept in an in-process bytearray.
+
+    Each process opens and maps the file itself on first use: a descriptor
+    inherited across ``fork`` (e.g. ``gunicorn --preload``) shares its lock
+    with the parent, so flock wouldn't keep the workers' appends apart.
+    """
+
+    def __init__(self, path=None, initial_capacity=1024):
+        self.path = path
+        self._lock = threading.RLock()
+        self._initial_size = _HEADER.size + initial_capacity * _RECORD.size
+        self._slots = {}
+        self._known = 0
+        self._fd = None
+        self._pid = None
+        self._buf = None
+
+        if not path:
+            self._buf = bytearray(self._initial_size)
+            _HEADER.pack_into(self._buf, 0, _MAGIC, _VERSION, 0)
+
+    def _open(self):
+        """Open and map the file in this process if it isn't yet; the caller holds _lock."""
+        if not self.path or self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < _HEADER.size:
+                os.ftruncate(fd, self._initial_size)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, _VERSION, 0), 0)
+            buf = mmap.mmap(fd, os.fstat(fd).st_size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+        magic, version, _ = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            buf.close()
+            os.close(fd)
+            raise ValueError(f"{self.path} is not a version {_VERSION} movie catalog")
+        self._fd, self._buf, self._pid = fd, buf, os.getpid()
+        self._slots = {}
+        self._known = 0
+        self._sync()
+
+    def _count(self):
+        """Number of records according to the header."""
+        return _HEADER.unpack_from(self._buf, 0)[2]
+
+    def _remap(self, size):
+        """Grow the storage to at least size bytes."""
+        if self._fd is None:
+            self._buf.extend(bytes(size - len(self._buf)))
+            return
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._buf.close()
+        self._buf = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+
+    def _sync(self):
+        """Index records appended since the last sync (possibly by other processes)."""
+        if self._fd is not None and os.fstat(self._fd).st_size > len(self._buf):
+            self._remap(os.fstat(self._fd).st_size)
+        count = self._count()
+        for slot in range(self._known, count):
+            movie_id = struct.unpack_from("<i", self._buf, _HEADER.size + slot * _RECORD.size)[0]
+            self._slots[movie_id] = slot
+        self._known = count
+
+    def _write(self, slot, record):
+        """Pack a record into its slot, keeping the true list lengths (capped at 255)."""
+        genre_ids = record.genre_ids[:MAX_GENRES]
+        keyword_ids = record.keyword_ids[:MAX_KEYWORDS]
+        _RECORD.pack_into(
+            self._buf, _HEADER.size + slot * _RECORD.size,
+            record.id, record.vote_average, record.popularity, record.year,
+            min(len(record.genre_ids), 255), min(len(record.keyword_ids), 255),
+            *genre_ids, *[0] * (MAX_GENRES - len(genre_ids)),
+            *keyword_ids, *[0] * (MAX_KEYWORDS - len(keyword_ids)),
+            _encode(record.poster_path, 40), _encode(record.title, 80)
+        )
+
+    def add(self, record):
+        """Insert or update a record."""
+        with self._lock:
+            self._open()
+            if self._fd is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._sync()
+                slot = self._slots.get(record.id)
+                if slot is None:
+                    slot = self._count()
+                    needed = _HEADER.size + (slot + 1) * _RECORD.size
+                    if needed > len(self._buf):
+                        self._remap(max(needed, len(self._buf) * 2))
+                    self._write(slot, record)
+                    _HEADER.pack_into(self._buf, 0, _MAGIC, _VERSION, slot + 1)
+                    self._slots[record.id] = slot
+                    self._known = slot + 1
+                else:
+                    self._write(slot, record)
+            finally:
+                if self._fd is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def add_details(self, movie):
+        """Store the features of a get_movie_details payload."""
+        if movie.get('id'):
+            self.add(CatalogRecord.from_details(movie))
+
+    def _read(self, slot):
+        """Unpack the record in a slot."""
+        fields = _RECORD.unpack_from(self._buf, _HEADER.size + slot * _RECORD.size)
+        movie_id, vote_average, popularity, year, genre_count, keyword_count = fields[:6]
+        genre_ids = list(fields[6:6 + min(genre_count, MAX_GENRES)])
+        keyword_ids = list(fields[6 + MAX_GENRES:6 + MAX_GENRES + min(keyword_count, MAX_KEYWORDS)])
+        poster_path, title = fields[-2:]
+        complete = genre_count <= MAX_GENRES and keyword_count <= MAX_KEYWORDS
+        return CatalogRecord(movie_id, _decode(title), genre_ids, keyword_ids,
+                             vote_average, popularity, year, _decode(poster_path), complete)
+
+    def get(self, movie_id):
+        """Get the record for a movie id, or None. Check ``complete`` before scoring with it."""
+        with self._lock:
+            self._open()
+            slot = self._slots.get(movie_id)
+            if slot is None and self._fd is not None and self._count() > self._known:
+                self._sync()
+                slot = self._slots.get(movie_id)
+            return None if slot is None else self._read(slot)
+
+    def records(self):
+        """Get every record, in insertion order."""
+        with self._lock:
+            self._open()
+            self._sync()
+            return [self._read(slot) for slot in range(self._known)]
+
+    def __len__(self):
+        with self._lock:
+            self._open()
+            self._sync()
+            return self._known
+
+    def clear(self):
+        """
+        Remove every record of an in-process catalog; returns whether it did.
+
+        A file-backed catalog is persistent and shared with other workers, so
+        it is left alone.
+        """
+        with self._lock:
+            if self.path:
+                return False
+            _HEADER.pack_into(self._buf, 0, _MAGIC, _VERSION, 0)
+            self._slots = {}
+            self._known = 0
+            return True
+
+    def stats(self):
+        """Get catalog size statistics."""
+        with self._lock:
+            self._open()
+            return {
+                "path": self.path,
+                "movies": self._known,
+                "bytes": len(self._buf)
+            }
+
+# Shared by every service instance in the process
+movie_catalog = MovieCatalog(CATALOG_PATH)
@@ -0,0 +1,139 @@
+"""In-process counters and latency histograms exposed in Prometheus text format."""
+from bisect import bisect_left
+import re
+import threading
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _escape(value):
+    """Escape a label value for the text exposition format."""
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _labels(names, values, extra=None):
+    """Render a label set such as {route="/api/trending",method="GET"}."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    """Format a sample value the way Prometheus expects."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *labelvalues, amount=1):
+        """Add amount to the counter for a label set."""
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        """Current value for a label set."""
+        with self._lock:
+            return self._values.get(labelvalues, 0)
+
+    def render(self):
+        """Lines of the text exposition format."""
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labelvalues, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+        return lines
+
+class Histogram:
+    """Bucketed distribution of observations (e.g. latencies) with optional labels."""
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        """Record one observation for a label set."""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then the sum
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labelvalues):
+        """Number of observations for a label set."""
+        with self._lock:
+            series = self._series.get(labelvalues)
+            return sum(series[:-1]) if series else 0
+
+    def render(self):
+        """Lines of the text exposition format, with cumulative buckets."""
+        with self._lock:
+            series = sorted((labelvalues, list(values)) for labelvalues, values in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labelvalues, values in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_number(values[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Add a metric and return it."""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+route_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling API requests.", ("route", "method", "status")
+))
+upstream_requests = registry.register(Counter(
+    "tmdb_requests_total", "TMDb API calls by endpoint and outcome.", ("endpoint", "status")
+))
+upstream_latency = registry.register(Histogram(
+    "tmdb_request_duration_seconds", "TMDb API call time, including retries but not rate-limit waits.", ("endpoint",)
+))
+rate_limit_wait = registry.register(Histogram(
+    "tmdb_rate_limit_wait_seconds", "Time requests were held back by the TMDb rate limiter.",
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+))
+cache_requests = registry.register(Counter(
+    "cache_requests_total", "Cached function lookups by result (hit, stale, coalesced, miss, negative, stale_if_error).", ("function", "result")
+))
+cache_evictions = registry.register(Counter(
+    "cache_evictions_total", "Entries evicted to stay within a cache policy's byte budget.", ("function",)
+))
+
+def endpoint_label(endpoint):
+    """Collapse ids in a TMDb endpoint path so calls group by endpoint, e.g. movie/{id}/recommendations."""
+    return re.sub(r'(?<=/)\d+(?=/|$)', '{id}', endpoint)
@@ -0,0 +1,173 @@
+"""
+Precomputed item-item neighbor index for content-based recommendations.
+
+Build it offline from a local catalog file with::
+
+    python -m utils.neighbor_index --catalog catalog.bin --output neighbors.bin
+
+and point ``NEIGHBOR_INDEX_PATH`` at the output. Recommendation routes then
+look neighbors up in constant time and only fall back to the live TMDb
+path for movies that are not in the index.
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import struct
+import time
+import numpy as np
+from config import CATALOG_PATH, NEIGHBOR_INDEX_PATH
+from utils.catalog import MovieCatalog
+from utils.scoring import top_k
+
+# File header: magic, format version, number of movies, neighbors per movie
+_HEADER = struct.Struct("<4sHxxII")
+_MAGIC = b"MNBR"
+_VERSION = 1
+
+class NeighborIndex:
+    """Read-only table of the top-N most similar movies for each movie id."""
+
+    def __init__(self, ids, neighbors):
+        self.ids = ids
+        self.neighbors_table = neighbors
+        self._rows = {int(movie_id): row for row, movie_id in enumerate(ids)}
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map an index file written by write()."""
+        with open(path, 'rb') as f:
+            magic, version, count, top_n = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} neighbor index")
+
+        ids = np.memmap(path, dtype='<i4', mode='r', offset=_HEADER.size, shape=(count,))
+        neighbors = np.memmap(path, dtype='<i4', mode='r', offset=_HEADER.size + 4 * count,
+                              shape=(count, top_n))
+        return cls(ids, neighbors)
+
+    def write(self, path):
+        """Write the index to path atomically."""
+        count, top_n = self.neighbors_table.shape
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, count, top_n))
+            f.write(np.asarray(self.ids, dtype='<i4').tobytes())
+            f.write(np.asarray(self.neighbors_table, dtype='<i4').tobytes())
+        os.replace(tmp_path, path)
+
+    def __contains__(self, movie_id):
+        return movie_id in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def neighbors(self, movie_id):
+        """Neighbor ids of a movie, most similar first, or None if it isn't indexed."""
+        row = self._rows.get(movie_id)
+        if row is None:
+            return None
+        return [int(neighbor) for neighbor in self.neighbors_table[row] if neighbor]
+
+# Per-process state of build workers, set up once by _init_worker
+_worker = {}
+
+def _postings(feature_lists):
+    """Map each feature id to the array of rows that have it."""
+    lengths = np.fromiter((len(ids) for ids in feature_lists), dtype=np.int64, count=len(feature_lists))
+    flat = np.fromiter((i for ids in feature_lists for i in ids), dtype=np.int64, count=int(lengths.sum()))
+    rows = np.repeat(np.arange(len(feature_lists)), lengths)
+    order = np.argsort(flat, kind='stable')
+    flat, rows = flat[order], rows[order]
+    keys, starts = np.unique(flat, return_index=True)
+    ends = np.append(starts[1:], len(flat))
+    return {int(key): rows[start:end] for key, start, end in zip(keys, starts, ends)}
+
+def _indexable_records(catalog_path):
+    """Catalog records holding all of their genres and keywords, so they score like the live path."""
+    return [record for record in MovieCatalog(catalog_path).records() if record.complete]
+
+def _init_worker(catalog_path):
+    """Load the catalog and build the feature postings in a worker process."""
+    records = _indexable_records(catalog_path)
+    _worker['ids'] = np.array([record.id for record in records], dtype=np.int64)
+    _worker['genres'] = [record.genre_ids for record in records]
+    _worker['keywords'] = [record.keyword_ids for record in records]
+    _worker['genre_postings'] = _postings(_worker['genres'])
+    _worker['keyword_postings'] = _postings(_worker['keywords'])
+    votes = np.array([record.vote_average for record in records], dtype=np.float64)
+    popularity = np.array([record.popularity for record in records], dtype=np.float64)
+    # Same vote/popularity terms as the live content-based scorer
+    _worker['base'] = votes / 10 + np.minimum(popularity / 100, 1)
+
+def _overlap(postings, feature_ids, count):
+    """Per-row overlap with feature_ids, from the postings of each feature."""
+    hits = [postings[i] for i in feature_ids if i in postings]
+    if not hits:
+        return np.zeros(count, dtype=np.float64)
+    return np.bincount(np.concatenate(hits), minlength=count).astype(np.float64)
+
+def _neighbors_for_rows(rows, top_n):
+    """Compute the neighbor ids of a chunk of catalog rows."""
+    ids = _worker['ids']
+    count = len(ids)
+    table = np.zeros((len(rows), top_n), dtype=np.int64)
+
+    for out, row in enumerate(rows):
+        genre_overlap = _overlap(_worker['genre_postings'], _worker['genres'][row], count)
+        keyword_overlap = _overlap(_worker['keyword_postings'], _worker['keywords'][row], count)
+        scores = genre_overlap * 2 + keyword_overlap + _worker['base']
+
+        # Only movies sharing a genre or keyword are neighbors, and never the movie itself
+        scores[(genre_overlap + keyword_overlap) == 0] = -np.inf
+        scores[row] = -np.inf
+        best = [i for i in top_k(scores, top_n) if np.isfinite(scores[i])]
+        table[out, :len(best)] = ids[best]
+
+    return rows, table
+
+def build_index(catalog_path, top_n=20, workers=None, chunk_size=256):
+    """Build a NeighborIndex for every movie in a catalog file using a process pool."""
+    ids = np.array([record.id for record in _indexable_records(catalog_path)], dtype=np.int64)
+    neighbors = np.zeros((len(ids), top_n), dtype=np.int64)
+    chunks = [list(range(start, min(start + chunk_size, len(ids))))
+              for start in range(0, len(ids), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(catalog_path,)) as executor:
+        for rows, table in executor.map(_neighbors_for_rows, chunks, [top_n] * len(chunks)):
+            neighbors[rows] = table
+
+    return NeighborIndex(ids, neighbors)
+
+def load_neighbor_index(path):
+    """Load the index at path, or return None when it is unset or unreadable."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return NeighborIndex.load(path)
+    except (OSError, ValueError) as e:
+        print(f"Error loading neighbor index {path}: {e}")
+        return None
+
+# Shared by every recommendation call in the process (None without an index file)
+neighbor_index = load_neighbor_index(NEIGHBOR_INDEX_PATH)
+
+def main():
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Build the item-item neighbor index from a movie catalog.")
+    parser.add_argument('--catalog', default=CATALOG_PATH, help="catalog file (default: CATALOG_PATH)")
+    parser.add_argument('--output', default=NEIGHBOR_INDEX_PATH, help="index file (default: NEIGHBOR_INDEX_PATH)")
+    parser.add_argument('--top-n', type=int, default=20, help="neighbors kept per movie")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if not args.catalog or not args.output:
+        parser.error("--catalog and --output are required when CATALOG_PATH/NEIGHBOR_INDEX_PATH are not set")
+
+    started = time.time()
+    index = build_index(args.catalog, top_n=args.top_n, workers=args.workers)
+    index.write(args.output)
+    print(f"Indexed {len(index)} movies in {time.time() - started:.1f}s -> {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Sampling profiler that can be switched on and off in a running worker."""
+from collections import Counter
+import sys
+import threading
+import time
+
+class SamplingProfiler:
+    """
+    Periodically samples the stacks of every thread and counts them.
+
+    Sampling runs in a daemon thread only while started, so it costs
+    nothing when off. Stacks are kept in collapsed form ("a;b;c count"),
+    which flame graph tools read directly.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._samples = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        """Start sampling, clearing previous samples. Returns False if already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            if interval:
+                self.interval = interval
+            self._samples.clear()
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        """Stop sampling, keeping the samples collected so far. Returns False if not running."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join()
+        return True
+
+    def _stack(self, frame):
+        """Collapsed stack of a frame, outermost call first."""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = [self._stack(frame) for thread_id, frame in sys._current_frames().items()
+                      if thread_id != own_id]
+            with self._lock:
+                self._samples.update(stacks)
+
+    def report(self, limit=None):
+        """Collapsed stacks with their sample counts, most frequent first."""
+        with self._lock:
+            stacks = self._samples.most_common(limit)
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks) + '\n'
+
+    def stats(self):
+        """Profiler state and sample totals."""
+        with self._lock:
+            return {
+                "running": self._thread is not None,
+                "interval": self.interval,
+                "started_at": self.started_at,
+                "samples": sum(self._samples.values()),
+                "stacks": len(self._samples)
+            }
+
+# One profiler per worker process, controlled from the admin endpoints
+profiler = SamplingProfiler()
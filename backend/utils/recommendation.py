@@ -1,126 +1,339 @@
 """Utility functions for movie recommendations."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait
+import time
 from services.tmdb_service import TMDbService
-from cache import cached
+from services.async_tmdb_service import AsyncTMDbService
+from cache import cached, cached_async, Uncached
+from config import (
+    RECOMMENDATION_FETCH_WORKERS, RECOMMENDATION_SEED_WORKERS,
+    RECOMMENDATION_BUDGET_MS, RECOMMENDATION_HYBRID_TIMEOUT_MS
+)
+from utils.scoring import score_content, score_frequency, top_k
+from utils.catalog import movie_catalog
+from utils import neighbor_index as neighbors
 import random
 
 tmdb_service = TMDbService()
+async_tmdb_service = AsyncTMDbService()
 
-@cached
-def get_content_based_recommendations(movie_id, limit=10):
+# Bounded pool for upstream fetches made while scoring; every fetch still
+# passes through the service's shared rate limiter
+_fetch_executor = ThreadPoolExecutor(max_workers=RECOMMENDATION_FETCH_WORKERS, thread_name_prefix="recommendation-fetch")
+
+# Separate pool for hybrid seeds, which themselves wait on _fetch_executor
+_seed_executor = ThreadPoolExecutor(max_workers=RECOMMENDATION_SEED_WORKERS, thread_name_prefix="recommendation-seed")
+
+# Hybrid seed tasks still running after their request's deadline
+_background_seeds = set()
+
+# Fields of TMDb result-list entries, the shape recommendations are returned in
+LIST_FIELDS = (
+    'id', 'title', 'original_title', 'original_language', 'overview', 'poster_path', 'poster_url',
+    'backdrop_path', 'release_date', 'vote_average', 'vote_count', 'popularity', 'adult', 'video'
+)
+
+def _keyword_ids(movie_details):
+    """Extract keyword ids from a movie details payload."""
+    return [keyword['id'] for keyword in movie_details.get('keywords', {}).get('keywords', [])]
+
+def _features(movie_details):
+    """Genre ids and keyword ids of a movie details payload."""
+    return [genre['id'] for genre in movie_details.get('genres', [])], _keyword_ids(movie_details)
+
+def _catalog_features(movie_id):
+    """The catalog record of a movie if it holds all of its genres and keywords, else None."""
+    record = movie_catalog.get(movie_id)
+    return record if record is not None and record.complete else None
+
+def _catalog_keywords(movie_ids):
+    """Keyword ids of the movies already in the local catalog."""
+    candidate_keywords = {}
+    for movie_id in movie_ids:
+        record = _catalog_features(movie_id)
+        if record is not None:
+            candidate_keywords[movie_id] = record.keyword_ids
+    return candidate_keywords
+
+def _fetch_candidate_keywords(movie_ids, deadline=None):
+    """
+    Fetch keyword ids for candidate movies concurrently.
+
+    Returns a dict of movie id to keyword ids. Candidates whose details
+    failed or did not arrive before the deadline are left out; their
+    fetches keep running in the background and still fill the cache.
+    """
+    futures = {
+        _fetch_executor.submit(tmdb_service.get_movie_details, movie_id): movie_id
+        for movie_id in movie_ids
+    }
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    done, _ = wait(futures, timeout=timeout)
+
+    candidate_keywords = {}
+    for future in done:
+        if future.exception() is None:
+            candidate_keywords[futures[future]] = _keyword_ids(future.result())
+    return candidate_keywords
+
+def _score_content_based(genre_ids, keyword_ids, candidates, candidate_keywords, limit):
+    """Rank candidates by genre/keyword overlap with the source movie plus votes."""
+    # Genres weigh double; keywords only count when the candidate's keywords are known
+    scores = score_content(
+        genre_ids,
+        keyword_ids,
+        [movie.get('genre_ids', []) for movie in candidates],
+        [candidate_keywords.get(movie['id'], []) for movie in candidates],
+        [movie.get('vote_average') for movie in candidates],
+        [movie.get('popularity') for movie in candidates]
+    )
+
+    return [candidates[i] for i in top_k(scores, limit)]
+
+def _list_entry(movie_details):
+    """A movie details payload shaped like an entry of a TMDb result list."""
+    entry = {field: movie_details[field] for field in LIST_FIELDS if field in movie_details}
+    entry['genre_ids'] = [genre['id'] for genre in movie_details.get('genres', [])]
+    return entry
+
+def _indexed_neighbor_ids(movie_id, limit):
+    """The first limit precomputed neighbors of a movie, or None if it isn't indexed."""
+    index = neighbors.neighbor_index
+    if index is None:
+        return None
+    neighbor_ids = index.neighbors(movie_id)
+    return neighbor_ids[:limit] if neighbor_ids else None
+
+def _indexed_results(neighbor_ids, details):
+    """Result-list entries of the neighbors whose details arrived, in neighbor order."""
+    results = [_list_entry(details[neighbor_id]) for neighbor_id in neighbor_ids if neighbor_id in details]
+    return results if len(results) == len(neighbor_ids) else Uncached(results)
+
+def _indexed_recommendations(movie_id, limit, deadline=None):
+    """
+    Recommendations of a movie from the neighbor index, or None if it isn't indexed.
+
+    Neighbors are returned like live results, built from their (cached)
+    details; details missing from the cache are fetched concurrently. If
+    some don't arrive before the deadline, the rest are returned uncached.
+    """
+    neighbor_ids = _indexed_neighbor_ids(movie_id, limit)
+    if neighbor_ids is None:
+        return None
+
+    futures = {
+        _fetch_executor.submit(tmdb_service.get_movie_details, neighbor_id): neighbor_id
+        for neighbor_id in neighbor_ids
+    }
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    done, _ = wait(futures, timeout=timeout)
+    details = {futures[future]: future.result() for future in done if future.exception() is None}
+    return _indexed_results(neighbor_ids, details)
+
+async def _indexed_recommendations_async(movie_id, limit, timeout=None):
+    """Async version of _indexed_recommendations; must run on the TMDb I/O loop."""
+    neighbor_ids = _indexed_neighbor_ids(movie_id, limit)
+    if neighbor_ids is None:
+        return None
+
+    tasks = {
+        asyncio.ensure_future(async_tmdb_service.get_movie_details(neighbor_id)): neighbor_id
+        for neighbor_id in neighbor_ids
+    }
+    done, _ = await asyncio.wait(tasks, timeout=timeout)
+    details = {tasks[task]: task.result() for task in done if task.exception() is None}
+    return _indexed_results(neighbor_ids, details)
+
+def _keyword_candidates(genre_ids, keyword_ids, candidates):
+    """Ids of candidates whose keywords are worth looking up (those sharing a genre)."""
+    if not keyword_ids:
+        return []
+    genre_ids = set(genre_ids)
+    return [movie['id'] for movie in candidates if genre_ids.intersection(movie.get('genre_ids', []))]
+
+@cached(exclude=("budget_ms",))
+def get_content_based_recommendations(movie_id, limit=10, budget_ms=RECOMMENDATION_BUDGET_MS):
     """
     Get content-based movie recommendations.
 
     This uses TMDb's recommendation API and enhances it with additional
     filtering based on genres and keywords.
+
+    Movies in the precomputed neighbor index are answered from it, with
+    only the neighbors' details looked up. Otherwise genres and keywords are
+    read from the local catalog when it has the movie; the rest are fetched
+    concurrently. If ``budget_ms`` runs out first, the remaining candidates
+    are scored on genres and votes only and the result is not cached.
     """
-    # Get movie details to extract genres and keywords
-    movie_details = tmdb_service.get_movie_details(movie_id)
+    deadline = None if budget_ms is None else time.monotonic() + budget_ms / 1000
+    indexed = _indexed_recommendations(movie_id, limit, deadline)
+    if indexed is not None:
+        return indexed
 
-    # Get TMDb recommendations
-    recommendations = tmdb_service.get_movie_recommendations(movie_id)
+    # Get the source features and TMDb recommendations concurrently
+    recommendations_future = _fetch_executor.submit(tmdb_service.get_movie_recommendations, movie_id)
+    record = _catalog_features(movie_id)
+    if record is not None:
+        genre_ids, keyword_ids = record.genre_ids, record.keyword_ids
+    else:
+        genre_ids, keyword_ids = _features(tmdb_service.get_movie_details(movie_id))
+    candidates = recommendations_future.result().get('results', [])
 
-    # Extract genre ids and keyword ids from the source movie
-    genre_ids = [genre['id'] for genre in movie_details.get('genres', [])]
-    keyword_ids = [keyword['id'] for keyword in movie_details.get('keywords', {}).get('keywords', [])]
+    to_score = _keyword_candidates(genre_ids, keyword_ids, candidates)
+    candidate_keywords = _catalog_keywords(to_score)
+    to_fetch = [candidate_id for candidate_id in to_score if candidate_id not in candidate_keywords]
+    if to_fetch:
+        candidate_keywords.update(_fetch_candidate_keywords(to_fetch, deadline))
 
-    # Score the recommendations based on similarity
-    scored_recommendations = []
+    results = _score_content_based(genre_ids, keyword_ids, candidates, candidate_keywords, limit)
+    return results if len(candidate_keywords) == len(to_score) else Uncached(results)
 
-    for movie in recommendations.get('results', []):
-        score = 0
+@cached_async(exclude=("budget_ms",), name="get_content_based_recommendations")
+async def get_content_based_recommendations_async(movie_id, limit=10, budget_ms=RECOMMENDATION_BUDGET_MS):
+    """
+    Async version of get_content_based_recommendations, sharing its cache entries.
 
-        # Score based on genre overlap
-        movie_genre_ids = movie.get('genre_ids', [])
-        genre_overlap = set(genre_ids).intersection(set(movie_genre_ids))
-        score += len(genre_overlap) * 2  # Weight genres more heavily
+    Must run on the TMDb I/O loop. Candidate fetches left unfinished by the
+    budget keep running on that loop and still fill the cache.
+    """
+    timeout = None if budget_ms is None else budget_ms / 1000
+    loop = asyncio.get_running_loop()
+    deadline = None if timeout is None else loop.time() + timeout
 
-        # Get additional details for keywords if needed
-        if keyword_ids and score > 0:
-            movie_detail = tmdb_service.get_movie_details(movie['id'])
-            movie_keywords = [kw['id'] for kw in movie_detail.get('keywords', {}).get('keywords', [])]
-            keyword_overlap = set(keyword_ids).intersection(set(movie_keywords))
-            score += len(keyword_overlap)
+    indexed = await _indexed_recommendations_async(movie_id, limit, timeout)
+    if indexed is not None:
+        return indexed
 
-        # Add vote average as a factor (normalized to 0-1 range)
-        if movie.get('vote_average'):
-            score += movie['vote_average'] / 10
+    record = _catalog_features(movie_id)
+    if record is not None:
+        genre_ids, keyword_ids = record.genre_ids, record.keyword_ids
+        recommendations = await async_tmdb_service.get_movie_recommendations(movie_id)
+    else:
+        movie_details, recommendations = await asyncio.gather(
+            async_tmdb_service.get_movie_details(movie_id),
+            async_tmdb_service.get_movie_recommendations(movie_id)
+        )
+        genre_ids, keyword_ids = _features(movie_details)
+    candidates = recommendations.get('results', [])
 
-        # Add popularity as a small factor (normalized)
-        if movie.get('popularity'):
-            score += min(movie['popularity'] / 100, 1)
+    to_score = _keyword_candidates(genre_ids, keyword_ids, candidates)
+    candidate_keywords = _catalog_keywords(to_score)
+    to_fetch = [candidate_id for candidate_id in to_score if candidate_id not in candidate_keywords]
+    if to_fetch:
+        tasks = {
+            asyncio.ensure_future(async_tmdb_service.get_movie_details(candidate_id)): candidate_id
+            for candidate_id in to_fetch
+        }
+        remaining = None if deadline is None else max(deadline - loop.time(), 0)
+        done, _ = await asyncio.wait(tasks, timeout=remaining)
+        for task in done:
+            if task.exception() is None:
+                candidate_keywords[tasks[task]] = _keyword_ids(task.result())
 
-        scored_recommendations.append({
-            'movie': movie,
-            'score': score
-        })
+    results = _score_content_based(genre_ids, keyword_ids, candidates, candidate_keywords, limit)
+    return results if len(candidate_keywords) == len(to_score) else Uncached(results)
 
-    # Sort by score and limit results
-    scored_recommendations.sort(key=lambda x: x['score'], reverse=True)
+def _merge_hybrid(all_recommendations, limit):
+    """Rank recommendations from several seeds by how often they appear plus votes."""
+    # Remove duplicates by movie id, counting how many seeds recommended each
+    unique_recommendations = {}
+    counts = {}
+    for movie in all_recommendations:
+        unique_recommendations.setdefault(movie['id'], movie)
+        counts[movie['id']] = counts.get(movie['id'], 0) + 1
 
-    # Return just the movies, not the scores
-    return [item['movie'] for item in scored_recommendations[:limit]]
+    movies = list(unique_recommendations.values())
+    scores = score_frequency(
+        [counts[movie['id']] for movie in movies],
+        [movie.get('vote_average') for movie in movies],
+        [movie.get('popularity') for movie in movies]
+    )
 
-@cached
-def get_hybrid_recommendations(movie_ids, limit=10):
+    return [movies[i] for i in top_k(scores, limit)]
+
+class PartialRecommendations(list):
+    """Recommendations merged from only the seeds that finished before a deadline."""
+
+    def __init__(self, movies, incomplete_seeds):
+        super().__init__(movies)
+        self.incomplete_seeds = incomplete_seeds
+
+def _log_background_seed(movie_id, error):
+    """Report a seed that failed after its request had already returned."""
+    if error is not None:
+        print(f"Error getting recommendations for movie {movie_id}: {error}")
+
+@cached(exclude=("timeout_ms",))
+def get_hybrid_recommendations(movie_ids, limit=10, timeout_ms=RECOMMENDATION_HYBRID_TIMEOUT_MS):
     """
     Get hybrid recommendations based on multiple input movies.
 
     This combines recommendations from multiple movies and ranks them.
+
+    Seeds are computed concurrently. If ``timeout_ms`` passes first, the
+    seeds that finished are merged into a PartialRecommendations listing
+    the rest, which is not cached; the slow seeds keep running in the
+    background and fill the cache for the next request.
     """
     if not movie_ids:
         return []
 
-    # Get recommendations for each movie
-    all_recommendations = []
+    futures = [
+        _seed_executor.submit(get_content_based_recommendations, movie_id, limit=limit)
+        for movie_id in movie_ids
+    ]
+    _, pending = wait(futures, timeout=None if timeout_ms is None else timeout_ms / 1000)
 
-    for movie_id in movie_ids:
-        try:
-            recommendations = get_content_based_recommendations(movie_id, limit=limit)
-            all_recommendations.extend(recommendations)
-        except Exception as e:
-            print(f"Error getting recommendations for movie {movie_id}: {e}")
-
-    # Remove duplicates by movie id
-    unique_recommendations = {}
-    for movie in all_recommendations:
-        movie_id = movie['id']
-        if movie_id not in unique_recommendations:
-            unique_recommendations[movie_id] = {
-                'movie': movie,
-                'count': 1
-            }
+    # Merge in seed order so ties rank the same however the seeds finish
+    all_recommendations = []
+    incomplete_seeds = []
+    for movie_id, future in zip(movie_ids, futures):
+        if future in pending:
+            incomplete_seeds.append(movie_id)
+            future.add_done_callback(lambda f, movie_id=movie_id: _log_background_seed(movie_id, f.exception()))
+        elif future.exception() is not None:
+            print(f"Error getting recommendations for movie {movie_id}: {future.exception()}")
         else:
-            unique_recommendations[movie_id]['count'] += 1
-
-    # Score by frequency of occurrence and other factors
-    scored_recommendations = []
-    for movie_id, data in unique_recommendations.items():
-        movie = data['movie']
-        count = data['count']
+            all_recommendations.extend(future.result())
 
-        # Base score is the frequency of the recommendation
-        score = count * 3
+    results = _merge_hybrid(all_recommendations, limit)
+    return Uncached(PartialRecommendations(results, incomplete_seeds)) if incomplete_seeds else results
 
-        # Add vote average as a factor
-        if movie.get('vote_average'):
-            score += movie['vote_average'] / 10
+@cached_async(exclude=("timeout_ms",), name="get_hybrid_recommendations")
+async def get_hybrid_recommendations_async(movie_ids, limit=10, timeout_ms=RECOMMENDATION_HYBRID_TIMEOUT_MS):
+    """
+    Async version of get_hybrid_recommendations, sharing its cache entries.
 
-        # Add popularity as a small factor
-        if movie.get('popularity'):
-            score += min(movie['popularity'] / 100, 0.5)
+    The per-seed recommendations are computed concurrently on the TMDb I/O
+    loop, where seeds left unfinished by ``timeout_ms`` keep running.
+    """
+    if not movie_ids:
+        return []
 
-        scored_recommendations.append({
-            'movie': movie,
-            'score': score
-        })
+    tasks = [
+        asyncio.ensure_future(get_content_based_recommendations_async(movie_id, limit=limit))
+        for movie_id in movie_ids
+    ]
+    _, pending = await asyncio.wait(tasks, timeout=None if timeout_ms is None else timeout_ms / 1000)
 
-    # Sort by score and limit results
-    scored_recommendations.sort(key=lambda x: x['score'], reverse=True)
+    # Merge in seed order so ties rank the same way as the sync version
+    all_recommendations = []
+    incomplete_seeds = []
+    for movie_id, task in zip(movie_ids, tasks):
+        if task in pending:
+            incomplete_seeds.append(movie_id)
+            _background_seeds.add(task)
+            task.add_done_callback(_background_seeds.discard)
+            task.add_done_callback(lambda t, movie_id=movie_id: _log_background_seed(movie_id, t.exception()))
+        elif task.exception() is not None:
+            print(f"Error getting recommendations for movie {movie_id}: {task.exception()}")
+        else:
+            all_recommendations.extend(task.result())
 
-    # Return just the movies, not the scores
-    return [item['movie'] for item in scored_recommendations[:limit]]
+    results = _merge_hybrid(all_recommendations, limit)
+    return Uncached(PartialRecommendations(results, incomplete_seeds)) if incomplete_seeds else results
 
-@cached
+@cached(policy="trending")
 def get_fallback_recommendations():
     """Get trending movies as a fallback when no specific recommendations exist."""
     trending = tmdb_service.get_trending_movies()
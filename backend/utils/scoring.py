@@ -0,0 +1,69 @@
+"""Vectorized scoring of recommendation candidates with NumPy."""
+from itertools import chain
+import numpy as np
+
+def _numbers(values):
+    """Float array from values, treating None as 0."""
+    return np.fromiter((value or 0 for value in values), dtype=np.float64, count=len(values))
+
+def overlap_counts(source_ids, candidate_ids):
+    """
+    Count, for each candidate, how many of its ids appear in source_ids.
+
+    ``candidate_ids`` is a list of id lists (genres or keywords). All lists
+    are flattened into one array and matched against the source in a single
+    ``np.isin`` pass, then counted back per candidate with ``np.bincount``.
+    """
+    count = len(candidate_ids)
+    if not count or not source_ids:
+        return np.zeros(count, dtype=np.int64)
+
+    lengths = np.fromiter((len(ids) for ids in candidate_ids), dtype=np.int64, count=count)
+    flat = np.fromiter(chain.from_iterable(candidate_ids), dtype=np.int64, count=int(lengths.sum()))
+    rows = np.repeat(np.arange(count), lengths)
+    matches = np.isin(flat, np.fromiter(source_ids, dtype=np.int64))
+    return np.bincount(rows[matches], minlength=count)
+
+def score_content(genre_ids, keyword_ids, candidate_genres, candidate_keywords,
+                  vote_averages, popularities, genre_weight=2, popularity_cap=1):
+    """
+    Score candidates by weighted genre/keyword overlap with a source movie plus votes.
+
+    Pass an empty keyword list for candidates whose keywords are unknown.
+    Returns an array of scores aligned with the candidates.
+    """
+    scores = overlap_counts(set(genre_ids), candidate_genres) * float(genre_weight)
+    scores += overlap_counts(set(keyword_ids), candidate_keywords)
+    scores += _numbers(vote_averages) / 10
+    scores += np.minimum(_numbers(popularities) / 100, popularity_cap)
+    return scores
+
+def score_frequency(counts, vote_averages, popularities, count_weight=3, popularity_cap=0.5):
+    """Score merged candidates by how many seeds recommended them plus votes."""
+    scores = np.asarray(counts, dtype=np.float64) * count_weight
+    scores += _numbers(vote_averages) / 10
+    scores += np.minimum(_numbers(popularities) / 100, popularity_cap)
+    return scores
+
+def top_k(scores, k):
+    """
+    Indices of the k highest scores, best first.
+
+    Uses ``np.partition`` to find the k-th best score without sorting every
+    candidate, then orders just the candidates at or above it. Ties keep
+    candidate order, like a stable descending sort.
+    """
+    count = len(scores)
+    k = min(k, count)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < count:
+        # Include every candidate tied with the k-th score so ties resolve by position
+        threshold = np.partition(scores, count - k)[count - k]
+        candidates = np.flatnonzero(scores >= threshold)
+    else:
+        candidates = np.arange(count)
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][:k]
@@ -0,0 +1,245 @@
+"""Incremental hybrid recommendation sessions for growing seed lists."""
+import asyncio
+from contextlib import contextmanager
+import heapq
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from config import RECOMMENDATION_SESSION_MAX, RECOMMENDATION_SESSION_TTL, RECOMMENDATION_SESSION_PATH
+from utils import recommendation
+from utils.scoring import score_frequency
+
+# Weight of each seed recommending a candidate, as in score_frequency
+COUNT_WEIGHT = 3
+
+class RecommendationSession:
+    """
+    Running hybrid candidate pool for one user's seed movies.
+
+    Each candidate keeps how many seeds recommended it and its vote and
+    popularity score, so adding or removing a seed only touches that seed's
+    candidates. Candidates are scored like get_hybrid_recommendations
+    would score them for the same seeds and limit.
+    """
+
+    def __init__(self, limit=10):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._seeds = {}
+        self._movies = {}
+        self._counts = {}
+        self._base_scores = {}
+        self._order = {}
+        self._next_order = 0
+
+    @property
+    def seeds(self):
+        """Seed movie ids, in the order they were added."""
+        with self._lock:
+            return list(self._seeds)
+
+    def has_seed(self, movie_id):
+        """Whether movie_id is already a seed."""
+        with self._lock:
+            return movie_id in self._seeds
+
+    def add_seed(self, movie_id, candidates):
+        """Add a seed and merge its recommended movies into the pool."""
+        candidates = list({movie['id']: movie for movie in candidates}.values())
+        base_scores = score_frequency(
+            [0] * len(candidates),
+            [movie.get('vote_average') for movie in candidates],
+            [movie.get('popularity') for movie in candidates]
+        )
+
+        with self._lock:
+            if movie_id in self._seeds:
+                return
+            self._seeds[movie_id] = [movie['id'] for movie in candidates]
+            for movie, base_score in zip(candidates, base_scores):
+                candidate_id = movie['id']
+                if candidate_id not in self._movies:
+                    self._movies[candidate_id] = movie
+                    self._base_scores[candidate_id] = float(base_score)
+                    self._order[candidate_id] = self._next_order
+                    self._next_order += 1
+                self._counts[candidate_id] = self._counts.get(candidate_id, 0) + 1
+
+    def add_seeds(self, seeds):
+        """Add seeds from a dict of seed movie id to its recommended movies."""
+        for movie_id, candidates in seeds.items():
+            self.add_seed(movie_id, candidates)
+
+    def remove_seed(self, movie_id):
+        """Remove a seed and its contribution to the pool. Returns False if it wasn't a seed."""
+        with self._lock:
+            candidate_ids = self._seeds.pop(movie_id, None)
+            if candidate_ids is None:
+                return False
+            for candidate_id in candidate_ids:
+                self._counts[candidate_id] -= 1
+                if not self._counts[candidate_id]:
+                    for accumulator in (self._counts, self._movies, self._base_scores, self._order):
+                        del accumulator[candidate_id]
+            return True
+
+    def top(self, limit=None):
+        """The best candidates, with ties going to the earliest added."""
+        limit = self.limit if limit is None else limit
+        with self._lock:
+            best = heapq.nlargest(
+                limit, self._movies,
+                key=lambda candidate_id: (
+                    self._counts[candidate_id] * COUNT_WEIGHT + self._base_scores[candidate_id],
+                    -self._order[candidate_id]
+                )
+            )
+            return [self._movies[candidate_id] for candidate_id in best]
+
+    def to_state(self):
+        """JSON-serializable state: the limit and each seed with its recommended movies."""
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'seeds': [[movie_id, [self._movies[candidate_id] for candidate_id in candidate_ids]]
+                          for movie_id, candidate_ids in self._seeds.items()]
+            }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a session from to_state() output by replaying its seeds in order."""
+        session = cls(state['limit'])
+        for movie_id, candidates in state['seeds']:
+            session.add_seed(movie_id, candidates)
+        return session
+
+class SessionStore:
+    """
+    Sessions by token in SQLite, evicting the least recently used and idle ones.
+
+    With a ``path``, sessions live in that file and every worker process on
+    the host shares them, so any worker can serve any token. Without one
+    they live in a per-process in-memory database. Sessions are stored as
+    their state and rebuilt on every lookup; changes go through
+    ``update()``, which applies them in a write transaction so concurrent
+    workers don't lose each other's seeds.
+    """
+
+    def __init__(self, path=None, max_sessions=RECOMMENDATION_SESSION_MAX, idle_ttl=RECOMMENDATION_SESSION_TTL):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        """This process's connection, opened on first use so forked workers don't share one."""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path or ":memory:", timeout=5, isolation_level=None, check_same_thread=False)
+            if self.path:
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "token TEXT PRIMARY KEY, state TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        """A write transaction that first drops idle sessions; yields (connection, now)."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                conn.execute("DELETE FROM sessions WHERE last_used < ?", (now - self.idle_ttl,))
+                yield conn, now
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _load(self, conn, token, now):
+        """Load a session and mark it used, or None."""
+        row = conn.execute("SELECT state FROM sessions WHERE token = ?", (token,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE sessions SET last_used = ? WHERE token = ?", (now, token))
+        return RecommendationSession.from_state(json.loads(row[0]))
+
+    def create(self, session):
+        """Store a new session and return its token."""
+        token = secrets.token_urlsafe(16)
+        with self._transaction() as (conn, now):
+            conn.execute(
+                "INSERT INTO sessions (token, state, last_used) VALUES (?, ?, ?)",
+                (token, json.dumps(session.to_state()), now)
+            )
+            conn.execute(
+                "DELETE FROM sessions WHERE token IN ("
+                "SELECT token FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+        return token
+
+    def get(self, token):
+        """Get a live session and mark it used, or None."""
+        with self._transaction() as (conn, now):
+            return self._load(conn, token, now)
+
+    def update(self, token, change):
+        """
+        Apply change(session) to a live session and save it.
+
+        Returns (session, change's return value), or None if the session
+        doesn't exist.
+        """
+        with self._transaction() as (conn, now):
+            session = self._load(conn, token, now)
+            if session is None:
+                return None
+            result = change(session)
+            conn.execute("UPDATE sessions SET state = ? WHERE token = ?", (json.dumps(session.to_state()), token))
+            return session, result
+
+    def delete(self, token):
+        """Delete a session. Returns False if it didn't exist."""
+        with self._transaction() as (conn, _):
+            return conn.execute("DELETE FROM sessions WHERE token = ?", (token,)).rowcount > 0
+
+    def __len__(self):
+        with self._transaction() as (conn, _):
+            return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+async def fetch_seeds(session, movie_ids):
+    """
+    Fetch recommendations for seeds not yet in a session, concurrently.
+
+    Must run on the TMDb I/O loop. Returns a dict of seed movie id to its
+    recommended movies, for ``session.add_seeds``, and a dict of per-seed
+    error messages for seeds that failed.
+    """
+    new_ids = [movie_id for movie_id in dict.fromkeys(movie_ids) if not session.has_seed(movie_id)]
+    per_seed = await asyncio.gather(
+        *(recommendation.get_content_based_recommendations_async(movie_id, limit=session.limit)
+          for movie_id in new_ids),
+        return_exceptions=True
+    )
+
+    seeds = {}
+    errors = {}
+    for movie_id, candidates in zip(new_ids, per_seed):
+        if isinstance(candidates, Exception):
+            errors[str(movie_id)] = str(candidates)
+        else:
+            seeds[movie_id] = candidates
+    return seeds, errors
+
+# Shared by every request in the process, and by every worker when RECOMMENDATION_SESSION_PATH is set
+session_store = SessionStore(RECOMMENDATION_SESSION_PATH)
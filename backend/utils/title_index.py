@@ -0,0 +1,142 @@
+"""In-process prefix index of movie titles for autocomplete."""
+from bisect import bisect_left, insort
+import heapq
+import json
+import re
+import threading
+import unicodedata
+
+# Stop scanning after this many index keys so very short prefixes stay fast
+MAX_SCAN = 5000
+
+def normalize_title(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r'[\W_]+', ' ', text.lower()).strip()
+
+class TitleIndex:
+    """
+    Sorted-array prefix index over movie titles, ranked by popularity.
+
+    Every word start of a title is a key ("the dark knight", "dark knight",
+    "knight"), so a query matches titles containing a word beginning with
+    it. Lookups are a bisect plus a short scan.
+
+    The index also remembers queries whose upstream search returned every
+    match. Any longer query starting with one of them can be answered
+    locally, because its matches are a subset of results already indexed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._movies = {}
+        self._complete_queries = set()
+
+    def _entry(self, movie):
+        """Compact autocomplete entry for a movie payload."""
+        release_date = movie.get('release_date') or ''
+        return {
+            'id': movie['id'],
+            'title': movie.get('title') or movie.get('original_title'),
+            'year': release_date[:4],
+            'poster_url': movie.get('poster_url'),
+            'popularity': movie.get('popularity') or 0
+        }
+
+    def _title_keys(self, movie_id, title):
+        """Index keys for every word start of a title."""
+        words = normalize_title(title).split()
+        return [(' '.join(words[i:]), movie_id) for i in range(len(words))]
+
+    def add_movies(self, movies):
+        """Add or update movies from any TMDb movie payloads (search, trending, details...)."""
+        with self._lock:
+            for movie in movies:
+                if not movie.get('id') or not (movie.get('title') or movie.get('original_title')):
+                    continue
+                entry = self._entry(movie)
+                existing = self._movies.get(entry['id'])
+                if existing is None:
+                    for key in self._title_keys(entry['id'], entry['title']):
+                        insort(self._keys, key)
+                    self._movies[entry['id']] = entry
+                else:
+                    # Keep fields we already know when a sparser payload comes in
+                    existing.update({k: v for k, v in entry.items() if v})
+
+    def load_file(self, path):
+        """
+        Bulk-load titles from a JSON-lines file, such as a TMDb daily ID export.
+
+        Each line needs an ``id`` and a ``title`` or ``original_title``;
+        ``popularity``, ``release_date`` and ``poster_path`` are optional.
+        """
+        entries = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                movie = json.loads(line)
+                if movie.get('id') and (movie.get('title') or movie.get('original_title')):
+                    entries.append(self._entry(movie))
+
+        with self._lock:
+            for entry in entries:
+                if entry['id'] not in self._movies:
+                    self._keys.extend(self._title_keys(entry['id'], entry['title']))
+                    self._movies[entry['id']] = entry
+            self._keys.sort()
+        return len(entries)
+
+    def mark_complete(self, query):
+        """Record that an upstream search for query returned every match."""
+        normalized = normalize_title(query)
+        if normalized:
+            with self._lock:
+                self._complete_queries.add(normalized)
+
+    def covers(self, query):
+        """Whether a shorter complete query means query can be answered locally."""
+        normalized = normalize_title(query)
+        with self._lock:
+            return any(normalized[:i] in self._complete_queries for i in range(1, len(normalized) + 1))
+
+    def suggest(self, query, limit=10):
+        """Return up to limit suggestions matching query, most popular first."""
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+
+        with self._lock:
+            matches = set()
+            start = bisect_left(self._keys, (prefix,))
+            for key, movie_id in self._keys[start:start + MAX_SCAN]:
+                if not key.startswith(prefix):
+                    break
+                matches.add(movie_id)
+            top = heapq.nlargest(limit, (self._movies[movie_id] for movie_id in matches),
+                                 key=lambda entry: entry['popularity'])
+
+        return [{k: entry[k] for k in ('id', 'title', 'year', 'poster_url')} for entry in top]
+
+    def clear(self):
+        """Forget every indexed movie and complete query, including bulk-loaded titles."""
+        with self._lock:
+            self._keys = []
+            self._movies = {}
+            self._complete_queries = set()
+
+    def stats(self):
+        """Get index size statistics."""
+        with self._lock:
+            return {
+                "movies": len(self._movies),
+                "keys": len(self._keys),
+                "complete_queries": len(self._complete_queries)
+            }
+
+# Shared by every service instance in the process
+title_index = TitleIndex()
@@ -0,0 +1,94 @@
+"""Cache warmup at startup and predictive prefetching of recommendations."""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from config import CACHE_WARMUP_MOVIES, PREFETCH_MIN_TOKENS, PREFETCH_MAX_PENDING
+from services.tmdb_service import rate_limiter
+from utils import recommendation
+
+def warm_cache(time_windows=('day', 'week'), max_movies=CACHE_WARMUP_MOVIES):
+    """
+    Fill the cache with what the homepage links to.
+
+    Fetches the trending lists, then the details and content-based
+    recommendations of the top trending movies. Every call goes through the
+    shared rate limiter, and failures are logged and skipped. Returns the
+    number of movies warmed.
+    """
+    movie_ids = []
+    for time_window in time_windows:
+        try:
+            trending = recommendation.tmdb_service.get_trending_movies(time_window)
+        except Exception as e:
+            print(f"Error warming trending movies ({time_window}): {e}")
+            continue
+        movie_ids.extend(movie['id'] for movie in trending.get('results', []))
+
+    movie_ids = list(dict.fromkeys(movie_ids))[:max_movies]
+    warmed = 0
+    for movie_id in movie_ids:
+        try:
+            recommendation.tmdb_service.get_movie_details(movie_id)
+            recommendation.get_content_based_recommendations(movie_id)
+            warmed += 1
+        except Exception as e:
+            print(f"Error warming movie {movie_id}: {e}")
+
+    print(f"Cache warmup finished: {warmed}/{len(movie_ids)} movies")
+    return warmed
+
+def start_warmup():
+    """Run warm_cache in a background thread so startup isn't delayed."""
+    thread = threading.Thread(target=warm_cache, name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+# A single low-priority worker, so prefetches never compete with each other for the rate limit
+_prefetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommendation-prefetch")
+_pending = set()
+_pending_lock = threading.Lock()
+
+def _has_spare_budget():
+    """Whether the rate limiter has enough tokens left for speculative work."""
+    return rate_limiter.available() >= PREFETCH_MIN_TOKENS
+
+def _prefetch(key, description, fetch):
+    """Run a queued prefetch if there is still spare upstream budget."""
+    try:
+        if _has_spare_budget():
+            fetch()
+    except Exception as e:
+        print(f"Error prefetching {description}: {e}")
+    finally:
+        with _pending_lock:
+            _pending.discard(key)
+
+def _queue(key, description, fetch):
+    """
+    Queue fetch on the prefetch worker.
+
+    Skipped when the rate limiter is short of tokens, when key is already
+    queued, or when PREFETCH_MAX_PENDING prefetches are waiting. Returns
+    whether the prefetch was queued.
+    """
+    if not _has_spare_budget():
+        return False
+    with _pending_lock:
+        if key in _pending or len(_pending) >= PREFETCH_MAX_PENDING:
+            return False
+        _pending.add(key)
+    _prefetch_executor.submit(_prefetch, key, description, fetch)
+    return True
+
+def prefetch_recommendations(movie_id):
+    """Queue a background computation of a movie's recommendations; returns whether it was queued."""
+    return _queue(
+        movie_id, f"recommendations for movie {movie_id}",
+        lambda: recommendation.get_content_based_recommendations(movie_id)
+    )
+
+def prefetch_search_page(query, page):
+    """Queue a background fetch of a movie search page into the cache; returns whether it was queued."""
+    return _queue(
+        ('search', query, page), f"search page {page} for {query!r}",
+        lambda: recommendation.tmdb_service.search_movies(query, page)
+    )
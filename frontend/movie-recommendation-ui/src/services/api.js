@@ -2,8 +2,9 @@
 const API_BASE_URL =
   process.env.REACT_APP_API_BASE || 'http://localhost:5002/api';
 
-export const searchMovies = async (query, page = 1, searchType = 'movie') => {
-  const response = await fetch(`${API_BASE_URL}/search?query=${encodeURIComponent(query)}&page=${page}&search_type=${searchType}`);
+export const searchMovies = async (query, page = 1, searchType = 'movie', pages = 1) => {
+  const pageRange = pages > 1 ? `&pages=${pages}` : '';
+  const response = await fetch(`${API_BASE_URL}/search?query=${encodeURIComponent(query)}&page=${page}&search_type=${searchType}${pageRange}`);
   if (!response.ok) throw new Error('Failed to search movies');
   return response.json();
 };
@@ -41,8 +42,28 @@ export const getTrendingMovies = async (timeWindow = 'week') => {
   return response.json();
 };
 
-export const getMovieWatchProviders = async (movieId) => {
-  const response = await fetch(`${API_BASE_URL}/movie/${movieId}/watch_providers`);
+export const getMovieWatchProviders = async (movieId, region = 'US') => {
+  const response = await fetch(`${API_BASE_URL}/movie/${movieId}/watch_providers?region=${region}`);
   if (!response.ok) throw new Error('Failed to fetch watch providers');
   return response.json();
 };
+
+export const getWatchProvidersBatch = async (movieIds, region = 'US') => {
+  const response = await fetch(`${API_BASE_URL}/movies/watch_providers/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids: movieIds, region }),
+  });
+  if (!response.ok) throw new Error('Failed to fetch watch providers');
+  return response.json();
+};
+
+export const getMoviesBatch = async (movieIds, slim = true) => {
+  const response = await fetch(`${API_BASE_URL}/movies/batch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids: movieIds, slim }),
+  });
+  if (!response.ok) throw new Error('Failed to fetch movies');
+  return response.json();
+};